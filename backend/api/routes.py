@@ -1,5 +1,6 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import APIRouter, File, Form, Query, UploadFile, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import io
 import uuid
 from PIL import Image
@@ -7,10 +8,18 @@ import numpy as np
 import cv2
 import time
 import os
+import tempfile
+from typing import List, Optional
 
 from core.celery_app import celery_app
-from models.schema import TaskResponse, TaskStatusResponse
-from services.model_service import get_predictor
+from models.schema import TaskResponse, TaskStatusResponse, RescaleRequest, RescaleResponse, VideoJobResponse
+from services.cdf_service import calculate_cdf_from_areas
+from services import results_store
+from services.video_service import (
+    FrameSampler, iter_video_frames, iter_image_frames,
+    save_video_job, load_video_job, build_time_series
+)
+from core.config import settings
 
 router = APIRouter()
 
@@ -25,12 +34,63 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+def _parse_timestamp(value, name):
+    """Normalize an ISO 8601 timestamp, or reject the request"""
+    try:
+        return results_store.normalize_timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 timestamp")
+
+def _validate_pixel_size(pixel_size_mm):
+    """Reject a pixel size that is given but not positive"""
+    if pixel_size_mm is not None and pixel_size_mm <= 0:
+        raise HTTPException(status_code=400, detail="pixel_size_mm must be positive")
+
+def _json_list_size(array):
+    """
+    Size in bytes of the JSON encoding of array.tolist() for a non-negative
+    integer array, computed without encoding it
+    """
+    digits = array.size + int(np.count_nonzero(array >= 10)) + int(np.count_nonzero(array >= 100))
+    
+    # One pair of brackets per list and ", " between items at every level
+    lists, separators, count = 0, 0, 1
+    for dim in array.shape:
+        lists += count
+        separators += count * (dim - 1)
+        count *= dim
+    
+    return digits + 2 * lists + 2 * separators
+
 @router.post("/predict")
-async def predict_image(file: UploadFile = File(...)):
+async def predict_image(
+    file: UploadFile = File(...),
+    pixel_size_mm: Optional[float] = Form(None),
+    site_id: Optional[str] = Form(None),
+    reference_length_mm: Optional[float] = Form(None),
+    adaptive: Optional[bool] = Form(None),
+    blast_id: Optional[str] = Form(None),
+    captured_at: Optional[str] = Form(None),
+    scale_bar_roi: Optional[str] = Form(None)
+):
     # Validate file
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
+    # Validate scale parameters
+    _validate_pixel_size(pixel_size_mm)
+    if reference_length_mm is not None and reference_length_mm <= 0:
+        raise HTTPException(status_code=400, detail="reference_length_mm must be positive")
+    if captured_at is not None:
+        captured_at = _parse_timestamp(captured_at, "captured_at")
+    if scale_bar_roi is not None:
+        try:
+            scale_bar_roi = [int(v) for v in scale_bar_roi.split(",")]
+        except ValueError:
+            scale_bar_roi = None
+        if scale_bar_roi is None or len(scale_bar_roi) != 4 or min(scale_bar_roi[2:]) <= 0:
+            raise HTTPException(status_code=400, detail="scale_bar_roi must be 'x,y,w,h' in pixels")
+    
     try:
         # Read image
         contents = await file.read()
@@ -47,12 +107,27 @@ async def predict_image(file: UploadFile = File(...)):
         # Generate task ID
         task_id = str(uuid.uuid4())
         
-        # Create Celery task
+        # Convert numpy array to list for serialization
+        serialize_start = time.time()
+        image_list = img_bgr.tolist()
+        publish_start = time.time()
+        
+        # Create Celery task (JSON encoding of the payload happens in here)
         task = celery_app.send_task(
             "tasks.inference_tasks.process_image",
-            args=[img_bgr.tolist()],  # Convert numpy array to list for serialization
+            args=[image_list],
+            kwargs={
+                "pixel_size_mm": pixel_size_mm,
+                "site_id": site_id,
+                "reference_length_mm": reference_length_mm,
+                "adaptive": adaptive,
+                "blast_id": blast_id,
+                "captured_at": captured_at,
+                "scale_bar_roi": scale_bar_roi
+            },
             task_id=task_id
         )
+        submitted_at = time.time()
         
         # Store task info
         tasks[task_id] = {
@@ -62,7 +137,17 @@ async def predict_image(file: UploadFile = File(...)):
         
         return JSONResponse(
             status_code=202,
-            content={"task_id": task_id, "status": "Task created"}
+            content={
+                "task_id": task_id,
+                "status": "Task created",
+                "timings": {
+                    "tolist_time": publish_start - serialize_start,
+                    "send_task_time": submitted_at - publish_start,
+                    "submitted_at": submitted_at,
+                    # JSON body only, the Redis transport base64-encodes it (about 4/3 larger) inside its envelope
+                    "json_payload_bytes": _json_list_size(img_bgr)
+                }
+            }
         )
     
     except Exception as e:
@@ -90,4 +175,241 @@ async def get_task_status(task_id: str):
     else:
         print(f"Task not ready, state: {task.state}")
         return {"status": "PENDING", "result": None}
-    
\ No newline at end of file
+
+@router.post("/task/{task_id}/rescale", response_model=RescaleResponse)
+async def rescale_task(task_id: str, request: RescaleRequest):
+    """Recompute metric stats and CDF of a finished task for a new pixel size"""
+    task = celery_app.AsyncResult(task_id)
+    
+    if not task.ready():
+        raise HTTPException(status_code=409, detail="Task is not finished yet")
+    if task.failed():
+        raise HTTPException(status_code=409, detail="Task failed, nothing to rescale")
+    
+    result = task.result
+    # An empty list is a valid result with no fragments, it rescales to zero stats
+    areas_px = (result or {}).get("stats", {}).get("areas_px")
+    if areas_px is None:
+        raise HTTPException(status_code=422, detail="Task result has no pixel measurements to rescale")
+    
+    stats, cdf_plot_base64 = calculate_cdf_from_areas(areas_px, request.pixel_size_mm)
+    
+    # Keep the results store in step, its size bins were computed at the old scale
+    try:
+        stored = await run_in_threadpool(results_store.rescale_result, task_id, stats)
+    except Exception as e:
+        print(f"Could not update result in store: {e}")
+        stored = False
+    
+    return {
+        "task_id": task_id,
+        "pixel_size_mm": request.pixel_size_mm,
+        "cdf_plot": cdf_plot_base64,
+        "stats": stats,
+        "stored": stored
+    }
+
+def _dispatch_frames(frames, scale_kwargs):
+    """
+    Send sampled frames to the workers, stats only, up to VIDEO_MAX_FRAMES
+    
+    Returns:
+        dispatched: List of {"time_s": ..., "task_id": ...}
+        truncated: Whether frames were left out because of VIDEO_MAX_FRAMES
+    """
+    dispatched = []
+    
+    for time_s, frame in frames:
+        if len(dispatched) >= settings.VIDEO_MAX_FRAMES:
+            return dispatched, True
+        
+        task_id = str(uuid.uuid4())
+        celery_app.send_task(
+            "tasks.inference_tasks.process_image",
+            args=[frame.tolist()],
+            kwargs={**scale_kwargs, "render": False, "store": False},
+            task_id=task_id
+        )
+        dispatched.append({"time_s": float(time_s), "task_id": task_id})
+    
+    return dispatched, False
+
+def _decode_images(contents):
+    """Decode images one at a time as the sampler consumes them"""
+    for data in contents:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not decode image")
+        yield image
+
+def _queue_video_job(frames, sampler, scale_kwargs):
+    job_id = str(uuid.uuid4())
+    dispatched, truncated = _dispatch_frames(frames, scale_kwargs)
+    save_video_job(job_id, dispatched, sampler, truncated)
+    
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "status": "Job created",
+            "frames_queued": len(dispatched),
+            "truncated": truncated,
+            "skipped_duplicates": sampler.skipped_duplicates,
+            "skipped_static": sampler.skipped_static
+        }
+    )
+
+@router.post("/predict/video")
+async def predict_video(
+    file: UploadFile = File(...),
+    sampling: str = Form("time"),
+    sample_interval_s: Optional[float] = Form(None),
+    motion_threshold: Optional[float] = Form(None),
+    hash_distance: Optional[int] = Form(None),
+    pixel_size_mm: Optional[float] = Form(None),
+    site_id: Optional[str] = Form(None)
+):
+    # Validate file
+    if not file.content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    
+    _validate_pixel_size(pixel_size_mm)
+    
+    try:
+        sampler = FrameSampler(sampling, sample_interval_s, motion_threshold, hash_distance)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    scale_kwargs = {"pixel_size_mm": pixel_size_mm, "site_id": site_id}
+    suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+    
+    # OpenCV decodes from a path, so stream the upload to a temporary file
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        while chunk := await file.read(1024 * 1024):
+            tmp.write(chunk)
+        tmp.flush()
+        
+        try:
+            # Decoding is blocking, keep it off the event loop
+            return await run_in_threadpool(
+                _queue_video_job, iter_video_frames(tmp.name, sampler), sampler, scale_kwargs
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+
+@router.post("/predict/sequence")
+async def predict_sequence(
+    files: List[UploadFile] = File(...),
+    frame_interval_s: float = Form(1.0),
+    sampling: str = Form("time"),
+    sample_interval_s: Optional[float] = Form(None),
+    motion_threshold: Optional[float] = Form(None),
+    hash_distance: Optional[int] = Form(None),
+    pixel_size_mm: Optional[float] = Form(None),
+    site_id: Optional[str] = Form(None)
+):
+    # Validate files
+    if any(not f.content_type.startswith("image/") for f in files):
+        raise HTTPException(status_code=400, detail="All files must be images")
+    
+    _validate_pixel_size(pixel_size_mm)
+    if frame_interval_s <= 0:
+        raise HTTPException(status_code=400, detail="frame_interval_s must be positive")
+    
+    try:
+        sampler = FrameSampler(sampling, sample_interval_s, motion_threshold, hash_distance)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    scale_kwargs = {"pixel_size_mm": pixel_size_mm, "site_id": site_id}
+    
+    contents = [await f.read() for f in files]
+    
+    try:
+        return await run_in_threadpool(
+            _queue_video_job, iter_image_frames(_decode_images(contents), frame_interval_s, sampler), sampler, scale_kwargs
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing images: {str(e)}")
+
+@router.get("/video/{job_id}", response_model=VideoJobResponse)
+async def get_video_job(job_id: str):
+    """Get the rolling fragment-size time series of a video job"""
+    job = load_video_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    
+    results = {}
+    failed = 0
+    for frame in job["frames"]:
+        task = celery_app.AsyncResult(frame["task_id"])
+        if task.successful():
+            results[frame["task_id"]] = task.result
+        elif task.failed():
+            failed += 1
+    
+    total = len(job["frames"])
+    done = len(results) + failed == total
+    
+    return {
+        "job_id": job_id,
+        "status": "SUCCESS" if done else "PENDING",
+        "total_frames": total,
+        "completed_frames": len(results),
+        "failed_frames": failed,
+        "truncated": job.get("truncated", False),
+        "skipped_duplicates": job["skipped_duplicates"],
+        "skipped_static": job["skipped_static"],
+        "series": build_time_series(job["frames"], results)
+    }
+
+@router.get("/results")
+async def list_results(
+    site_id: Optional[str] = None,
+    blast_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    offset: int = Query(0, ge=0)
+):
+    """List stored per-image summaries, newest first"""
+    start = _parse_timestamp(start, "start") if start else None
+    end = _parse_timestamp(end, "end") if end else None
+    
+    return await run_in_threadpool(
+        results_store.query_images, site_id, blast_id, start, end, limit, offset
+    )
+
+@router.get("/results/curve")
+async def results_curve(
+    site_id: Optional[str] = None,
+    blast_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """Aggregate fragment size CDF over all stored images that match"""
+    start = _parse_timestamp(start, "start") if start else None
+    end = _parse_timestamp(end, "end") if end else None
+    
+    return await run_in_threadpool(results_store.aggregate_curve, site_id, blast_id, start, end)
+
+@router.get("/results/trend")
+async def results_trend(
+    period: str = "day",
+    site_id: Optional[str] = None,
+    blast_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """Per-day, per-week or per-month averages of the stored summary stats"""
+    if period not in results_store.PERIOD_EXPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {list(results_store.PERIOD_EXPRESSIONS)}")
+    
+    start = _parse_timestamp(start, "start") if start else None
+    end = _parse_timestamp(end, "end") if end else None
+    
+    return await run_in_threadpool(results_store.trend, period, site_id, blast_id, start, end)
@@ -0,0 +1,36 @@
+import argparse
+import os
+import sys
+
+# Add the current directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.autoscaling_service import Autoscaler, DockerComposeScaler, ProcessScaler
+
+def main():
+    parser = argparse.ArgumentParser(description="Scale Celery workers from Redis queue metrics")
+    parser.add_argument("--backend", choices=["docker", "process"], default="process",
+                        help="Scale Docker Compose worker containers or local worker processes")
+    parser.add_argument("--compose-file", default="docker-compose.yaml",
+                        help="Compose file, only used with --backend docker")
+    parser.add_argument("--service", default="worker",
+                        help="Compose service to scale, only used with --backend docker")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="Seconds between control iterations (default: from settings)")
+    args = parser.parse_args()
+
+    if args.backend == "docker":
+        scaler = DockerComposeScaler(service=args.service, compose_file=args.compose_file)
+    else:
+        scaler = ProcessScaler()
+
+    try:
+        Autoscaler(scaler).run(interval=args.interval)
+    except KeyboardInterrupt:
+        print("Stopping autoscaler")
+    finally:
+        if isinstance(scaler, ProcessScaler):
+            scaler.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ celery_app = Celery(
     "rock_fragment_analysis",
     broker=broker_url,
     backend=result_backend,
-    include=["tasks.inference_tasks"]
+    include=["tasks.inference_tasks", "tasks.simulation_tasks"]
 )
 
 # Configure Celery
@@ -27,6 +27,14 @@ celery_app.conf.update(
     task_track_started=True,
     task_ignore_result=False,
     result_expires=None,  
+    # Reserve one task at a time and ack after it runs, so tasks stay in the
+    # Redis queue until a worker slot is free and the queue depth the
+    # autoscaler reads counts every waiting task
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    # Loading Mask R-CNN in worker_process_init (PRELOAD_MODEL) takes far
+    # longer than Celery's default 4 s before it kills the child process
+    worker_proc_alive_timeout=float(os.getenv("WORKER_PROC_ALIVE_TIMEOUT", "300")),
 )
 
 # app = Celery("rock_fragment_analysis", broker=os.getenv("CELERY_BROKER_URL"), backend=os.getenv("CELERY_RESULT_BACKEND"))
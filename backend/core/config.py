@@ -1,4 +1,5 @@
 import os
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -12,14 +13,58 @@ class Settings(BaseSettings):
     MODEL_CONFIG_PATH: str = os.getenv("MODEL_CONFIG_PATH", "/app/model/mask_rcnn_R_50_FPN_3x.yaml")
     MODEL_WEIGHTS_PATH: str = os.getenv("MODEL_WEIGHTS_PATH", "/app/model/model_final.pth")
     SCORE_THRESHOLD: float = 0.5
+    MODEL_VERSION: str = os.getenv("MODEL_VERSION", "mask_rcnn_R_50_FPN_3x")
+    PRELOAD_MODEL: bool = False  # Load the model when a worker process starts (see WORKER_PROC_ALIVE_TIMEOUT)
+    
+    # Adaptive resolution settings
+    ADAPTIVE_RESOLUTION: bool = False  # Choose the inference scale from a low-resolution pass
+    ADAPTIVE_PROBE_SIZE: int = 400  # Shortest edge of the low-resolution pass
+    ADAPTIVE_SCALES: List[int] = [400, 600, 800, 1000, 1200]  # Candidate shortest edges, smallest first
+    ADAPTIVE_MIN_FRAGMENT_PX: float = 16.0  # Smallest fragments must be at least this wide at model input
+    ADAPTIVE_SMALL_PERCENTILE: float = 10.0  # Percentile of fragment sizes treated as "smallest"
+    ADAPTIVE_TILE_OVERLAP: float = 0.2  # Overlap between tiles, as a fraction of the tile size (at least the largest probe fragment)
+    ADAPTIVE_MAX_TILES: int = 16
+    
+    # Fake model settings, for load testing without the real weights
+    FAKE_MODEL: bool = False  # Replace Mask R-CNN with synthetic masks
+    FAKE_MODEL_LATENCY_S: float = 0.5  # Mean simulated inference time
+    FAKE_MODEL_JITTER: float = 0.2  # Relative random variation of the latency
+    FAKE_MODEL_FRAGMENTS: int = 50  # Number of synthetic fragments per image
     
     # Celery settings
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
     
+    # Results store settings
+    RESULTS_DB_PATH: str = os.getenv("RESULTS_DB_PATH", "data/results.db")  # SQLite file shared by API and workers on one host
+    
+    # Video ingestion settings
+    VIDEO_SAMPLE_INTERVAL_S: float = 1.0  # Minimum time between sampled frames
+    VIDEO_MOTION_THRESHOLD: float = 8.0  # Mean grayscale difference (0-255) to count as motion
+    VIDEO_HASH_DISTANCE: int = 6  # Max dHash Hamming distance (of 64 bits) to count as duplicate
+    VIDEO_MAX_FRAMES: int = 500  # Maximum frames sent to the model per video
+    VIDEO_ROLLING_WINDOW: int = 5  # Frames in the rolling median of the time series
+    
+    # Autoscaling settings
+    AUTOSCALE_QUEUE: str = "celery"  # Celery queue to watch
+    AUTOSCALE_MIN_WORKERS: int = 1
+    AUTOSCALE_MAX_WORKERS: int = 4
+    AUTOSCALE_WORKER_CONCURRENCY: int = 1  # Tasks each worker runs at once
+    AUTOSCALE_TARGET_WAIT_S: float = 30.0  # Target time for a queued task to start
+    AUTOSCALE_POLL_INTERVAL_S: float = 5.0
+    AUTOSCALE_SCALE_DOWN_COOLDOWN_S: float = 120.0  # Minimum time between scaling down
+    AUTOSCALE_DEFAULT_SERVICE_TIME_S: float = 10.0  # Used until workers report service times
+    AUTOSCALE_DEFAULT_MODEL_LOAD_S: float = 20.0  # Used until workers report model load times
+    
     # CDF settings
     PIXEL_SIZE_MM: float = 3.0  # Size of one pixel in mm
     
+    # Scale calibration settings
+    SITE_PIXEL_SIZE_MM: Dict[str, float] = {}  # Per-site pixel size in mm, e.g. '{"pit-a": 2.5}'
+    SCALE_BAR_MIN_ASPECT: float = 4.0  # Minimum length/width ratio for a contour to count as a scale bar
+    SCALE_BAR_MIN_LENGTH_PX: int = 20  # Ignore scale bar candidates shorter than this
+    SCALE_BAR_HSV_RANGE: Optional[List[int]] = None  # Marker colour as [h, s, v, h, s, v] lower/upper bounds
+    
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,83 @@
+import redis
+
+from core.config import settings
+
+# Redis keys used to publish worker metrics
+SERVICE_TIMES_KEY = "metrics:service_times"
+TASKS_COMPLETED_KEY = "metrics:tasks_completed"
+MODEL_LOAD_TIMES_KEY = "metrics:model_load_times"
+TASK_RECEIVED_KEY = "metrics:received:{task_id}"
+
+# Number of samples kept for each metric
+MAX_SAMPLES = 200
+
+_client = None
+
+def get_redis():
+    """
+    Get or create the Redis client used for metrics
+    Shares the Celery broker so no extra service is needed
+    """
+    global _client
+
+    if _client is None:
+        _client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+
+    return _client
+
+def _push_sample(key, value):
+    pipe = get_redis().pipeline()
+    pipe.lpush(key, float(value))
+    pipe.ltrim(key, 0, MAX_SAMPLES - 1)
+    pipe.execute()
+
+def _read_samples(key, limit):
+    return [float(v) for v in get_redis().lrange(key, 0, limit - 1)]
+
+def record_service_time(seconds):
+    """Record how long a worker spent on one task"""
+    try:
+        _push_sample(SERVICE_TIMES_KEY, seconds)
+        get_redis().incr(TASKS_COMPLETED_KEY)
+    except redis.RedisError as e:
+        # Metrics must never fail a task
+        print(f"Could not record service time: {e}")
+
+def record_model_load_time(seconds):
+    """Record how long a worker took to load the model"""
+    try:
+        _push_sample(MODEL_LOAD_TIMES_KEY, seconds)
+    except redis.RedisError as e:
+        print(f"Could not record model load time: {e}")
+
+def record_task_received(task_id, timestamp):
+    """Record when the worker consumer received a task from the broker"""
+    try:
+        get_redis().set(TASK_RECEIVED_KEY.format(task_id=task_id), float(timestamp), ex=3600)
+    except redis.RedisError as e:
+        print(f"Could not record task received time: {e}")
+
+def pop_task_received(task_id):
+    """Get and remove the time a task was received, or None if unknown"""
+    try:
+        value = get_redis().getdel(TASK_RECEIVED_KEY.format(task_id=task_id))
+    except redis.RedisError as e:
+        print(f"Could not read task received time: {e}")
+        return None
+    return float(value) if value is not None else None
+
+def get_service_times(limit=50):
+    """Get the most recent task service times in seconds"""
+    return _read_samples(SERVICE_TIMES_KEY, limit)
+
+def get_model_load_times(limit=10):
+    """Get the most recent model load times in seconds"""
+    return _read_samples(MODEL_LOAD_TIMES_KEY, limit)
+
+def get_tasks_completed():
+    """Get the total number of tasks completed by all workers"""
+    return int(get_redis().get(TASKS_COMPLETED_KEY) or 0)
+
+def get_queue_depth(queue_name=None):
+    """Get the number of messages waiting in a Celery queue on the Redis broker"""
+    return int(get_redis().llen(queue_name or settings.AUTOSCALE_QUEUE))
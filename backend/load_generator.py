@@ -0,0 +1,49 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add the current directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.celery_app import celery_app
+from core.metrics import get_queue_depth
+
+def main():
+    """
+    Send bursty simulated inference load, shaped like traffic around blast times:
+    a low base rate with periodic bursts
+    """
+    parser = argparse.ArgumentParser(description="Send simulated inference tasks in bursts")
+    parser.add_argument("--base-rate", type=float, default=0.05, help="Tasks per second between bursts")
+    parser.add_argument("--burst-rate", type=float, default=1.0, help="Tasks per second during a burst")
+    parser.add_argument("--burst-duration", type=float, default=60.0, help="Seconds each burst lasts")
+    parser.add_argument("--period", type=float, default=300.0, help="Seconds between burst starts")
+    parser.add_argument("--service-time", type=float, default=5.0, help="Mean simulated task time in seconds")
+    parser.add_argument("--duration", type=float, default=900.0, help="Total seconds to run")
+    args = parser.parse_args()
+
+    start = time.time()
+    sent = 0
+    last_report = 0.0
+
+    while (elapsed := time.time() - start) < args.duration:
+        in_burst = (elapsed % args.period) < args.burst_duration
+        rate = args.burst_rate if in_burst else args.base_rate
+
+        # Poisson arrivals
+        time.sleep(random.expovariate(rate))
+
+        celery_app.send_task(
+            "tasks.simulation_tasks.simulate_inference",
+            args=[args.service_time]
+        )
+        sent += 1
+
+        if elapsed - last_report >= 5.0:
+            print(f"t={elapsed:.0f}s burst={in_burst} sent={sent} queue={get_queue_depth()}")
+            last_report = elapsed
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+import requests
+
+# Add the current directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.metrics import get_redis
+
+def make_test_image(width, height):
+    """Create a PNG of random noise to upload"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".png", image)
+    return buf.tobytes()
+
+def run_request(base_url, image_bytes, poll_interval, timeout):
+    """
+    Submit one image and poll until it finishes
+
+    Returns:
+        sample: Dictionary of timings for this request
+    """
+    start = time.time()
+    response = requests.post(
+        f"{base_url}/api/predict",
+        files={"file": ("image.png", image_bytes, "image/png")}
+    )
+    submitted = time.time()
+
+    if response.status_code != 202:
+        return {"ok": False, "error": f"HTTP {response.status_code}"}
+
+    created = response.json()
+    task_id = created["task_id"]
+    api_timings = created.get("timings", {})
+    api_submitted = api_timings.get("submitted_at", submitted)
+
+    while time.time() - start < timeout:
+        status_response = requests.get(f"{base_url}/api/task/{task_id}")
+        status = status_response.json()
+
+        if status["status"] == "SUCCESS":
+            done = time.time()
+            timings = status["result"].get("timings", {})
+            received = timings.get("worker_received_at")
+            started = timings.get("started_at", api_submitted)
+            return {
+                "ok": True,
+                "api_latency": submitted - start,
+                "tolist_time": api_timings.get("tolist_time"),
+                "send_task_time": api_timings.get("send_task_time"),
+                # Worker and API share a clock when run on one machine.
+                # queue_wait: sent to the broker -> taken off it by the worker consumer
+                "queue_wait": (received if received is not None else started) - api_submitted,
+                # delivery_time: payload JSON decode and IPC to the pool process
+                "delivery_time": started - received if received is not None else None,
+                "array_time": timings.get("array_time"),
+                "inference_time": timings.get("inference_time"),
+                "postprocess_time": timings.get("postprocess_time"),
+                "end_to_end": done - start,
+                "json_payload_bytes": api_timings.get("json_payload_bytes"),
+                "result_bytes": len(status_response.content),
+            }
+        if status["status"] == "FAILURE":
+            return {"ok": False, "error": str(status["result"])}
+
+        time.sleep(poll_interval)
+
+    return {"ok": False, "error": "timeout"}
+
+def redis_memory():
+    """Used memory of the Redis server in bytes"""
+    return int(get_redis().info("memory")["used_memory"])
+
+def report(samples, wall_time, memory_before, memory_after):
+    ok = [s for s in samples if s["ok"]]
+    failed = [s for s in samples if not s["ok"]]
+
+    print(f"\nRequests: {len(samples)}  succeeded: {len(ok)}  failed: {len(failed)}")
+    print(f"Wall time: {wall_time:.1f}s  throughput: {len(ok) / wall_time:.2f} images/s")
+
+    if ok:
+        print(f"\n{'metric (s)':<18}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+        for key in ("api_latency", "tolist_time", "send_task_time", "queue_wait", "delivery_time",
+                    "array_time", "inference_time", "postprocess_time", "end_to_end"):
+            # Older workers or APIs may not report every stage
+            values = np.array([s[key] for s in ok if s[key] is not None])
+            if values.size == 0:
+                print(f"{key:<18}{'n/a':>9}")
+                continue
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            print(f"{key:<18}{p50:>9.3f}{p90:>9.3f}{p99:>9.3f}{values.max():>9.3f}")
+
+        payloads = [s["json_payload_bytes"] for s in ok if s["json_payload_bytes"] is not None]
+        if payloads:
+            # Kombu's Redis transport base64-encodes the body, so the stored message is about 4/3 larger
+            mean = np.mean(payloads) / 2**20
+            print(f"\nMean JSON payload size: {mean:.1f} MiB (about {mean * 4 / 3:.1f} MiB in Redis)")
+        print(f"Mean result size: {np.mean([s['result_bytes'] for s in ok]) / 1024:.1f} KiB")
+
+    growth = memory_after - memory_before
+    print(f"Redis memory: {memory_before / 2**20:.1f} MiB -> {memory_after / 2**20:.1f} MiB "
+          f"(+{growth / 2**20:.1f} MiB, {growth / max(1, len(ok)) / 1024:.1f} KiB per task)")
+
+    errors = {}
+    for s in failed:
+        errors[s["error"]] = errors.get(s["error"], 0) + 1
+    for error, count in errors.items():
+        print(f"Error x{count}: {error}")
+
+def main():
+    """
+    Drive the API -> Redis -> worker path with concurrent clients
+
+    Start the workers with FAKE_MODEL=true to measure the system without model compute.
+    """
+    parser = argparse.ArgumentParser(description="Load test the prediction API")
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests")
+    parser.add_argument("--width", type=int, default=1024, help="Test image width")
+    parser.add_argument("--height", type=int, default=768, help="Test image height")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="Seconds between status polls")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds before a request is abandoned")
+    args = parser.parse_args()
+
+    image_bytes = make_test_image(args.width, args.height)
+    memory_before = redis_memory()
+
+    samples = []
+    lock = threading.Lock()
+
+    def worker(_):
+        sample = run_request(args.url, image_bytes, args.poll_interval, args.timeout)
+        with lock:
+            samples.append(sample)
+            if len(samples) % 10 == 0:
+                print(f"{len(samples)}/{args.requests} done")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(worker, range(args.requests)))
+    wall_time = time.time() - start
+
+    report(samples, wall_time, memory_before, redis_memory())
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any, Union
 
 class TaskResponse(BaseModel):
@@ -17,3 +17,36 @@ class PredictionResult(BaseModel):
     cdf_plot: str  # Base64 encoded image
     fragment_count: int
     stats: Dict[str, Any]
+
+class RescaleRequest(BaseModel):
+    """Request model for rescaling stored results to a new pixel size"""
+    pixel_size_mm: float = Field(..., gt=0)
+
+class RescaleResponse(BaseModel):
+    """Response model for rescaled results"""
+    task_id: str
+    pixel_size_mm: float
+    cdf_plot: Optional[str] = None  # Base64 encoded image, None when there are no fragments
+    stats: Dict[str, Any]
+    stored: bool = False  # Whether the results store was updated
+
+class TimeSeriesPoint(BaseModel):
+    """One sampled frame of a video fragment-size time series"""
+    time_s: float
+    N: int
+    D50: float
+    D90: float
+    rolling_D50: float
+    rolling_D90: float
+
+class VideoJobResponse(BaseModel):
+    """Response model for video job status"""
+    job_id: str
+    status: str
+    total_frames: int
+    completed_frames: int
+    failed_frames: int
+    truncated: bool
+    skipped_duplicates: int
+    skipped_static: int
+    series: List[TimeSeriesPoint]
@@ -0,0 +1,197 @@
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+from statistics import median
+
+from core.config import settings
+from core import metrics
+
+def desired_workers(queue_depth, arrival_rate, service_time, model_load_time, current_workers,
+                    concurrency=None, target_wait=None, min_workers=None, max_workers=None):
+    """
+    Calculate how many workers are needed for the current load
+
+    A new worker only helps after it has loaded the model, so the queue is
+    projected forward by the model load time before sizing the pool.
+
+    Args:
+        queue_depth: Number of tasks waiting in the queue
+        arrival_rate: Tasks arriving per second
+        service_time: Seconds one task takes on one worker slot
+        model_load_time: Seconds a new worker needs before taking tasks
+        current_workers: Number of workers running now
+        concurrency: Tasks each worker runs at once (default: from settings)
+        target_wait: Seconds a queued task should wait at most (default: from settings)
+        min_workers: Lower bound (default: from settings)
+        max_workers: Upper bound (default: from settings)
+
+    Returns:
+        workers: Number of workers to run
+    """
+    concurrency = concurrency or settings.AUTOSCALE_WORKER_CONCURRENCY
+    target_wait = target_wait or settings.AUTOSCALE_TARGET_WAIT_S
+    min_workers = settings.AUTOSCALE_MIN_WORKERS if min_workers is None else min_workers
+    max_workers = settings.AUTOSCALE_MAX_WORKERS if max_workers is None else max_workers
+
+    # Tasks per second the current pool can finish
+    capacity = current_workers * concurrency / service_time
+
+    # Queue depth by the time a newly started worker is ready
+    projected_depth = max(0.0, queue_depth + (arrival_rate - capacity) * model_load_time)
+
+    # Slots needed to keep up with arrivals, plus slots to drain the backlog in time
+    steady_slots = arrival_rate * service_time
+    drain_slots = projected_depth * service_time / target_wait
+
+    workers = math.ceil((steady_slots + drain_slots) / concurrency)
+
+    return max(min_workers, min(max_workers, workers))
+
+class DockerComposeScaler:
+    """
+    Scale the worker service of a Docker Compose project
+
+    The worker command in docker-compose.yaml takes its --concurrency from
+    AUTOSCALE_WORKER_CONCURRENCY, which this scaler sets, so the containers it
+    starts have the concurrency the policy assumes.
+    """
+
+    def __init__(self, service="worker", compose_file="docker-compose.yaml", concurrency=None):
+        self.service = service
+        self.compose_file = compose_file
+        self.concurrency = concurrency or settings.AUTOSCALE_WORKER_CONCURRENCY
+
+    def _compose(self, *args):
+        env = {**os.environ, "AUTOSCALE_WORKER_CONCURRENCY": str(self.concurrency)}
+        return subprocess.run(
+            ["docker", "compose", "-f", self.compose_file, *args],
+            check=True, capture_output=True, text=True, env=env
+        ).stdout
+
+    def current(self):
+        output = self._compose("ps", "-q", self.service)
+        return len([line for line in output.splitlines() if line.strip()])
+
+    def scale(self, workers):
+        self._compose("up", "-d", "--no-deps", "--no-recreate", "--scale", f"{self.service}={workers}", self.service)
+
+class ProcessScaler:
+    """Scale local Celery worker processes"""
+
+    def __init__(self, concurrency=None, cwd=None):
+        self.concurrency = concurrency or settings.AUTOSCALE_WORKER_CONCURRENCY
+        self.cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.processes = []
+        self._counter = 0
+
+    def _reap(self):
+        self.processes = [p for p in self.processes if p.poll() is None]
+
+    def current(self):
+        self._reap()
+        return len(self.processes)
+
+    def scale(self, workers):
+        self._reap()
+
+        while len(self.processes) < workers:
+            self._counter += 1
+            self.processes.append(subprocess.Popen(
+                [sys.executable, "-m", "celery", "-A", "core.celery_app", "worker",
+                 "--loglevel=info", f"--concurrency={self.concurrency}",
+                 "-n", f"autoscaled{self._counter}@%h"],
+                cwd=self.cwd
+            ))
+
+        while len(self.processes) > workers:
+            # SIGTERM is a warm shutdown: the worker finishes its current task first
+            self.processes.pop().send_signal(signal.SIGTERM)
+
+    def shutdown(self):
+        self.scale(0)
+
+class Autoscaler:
+    """Control loop that resizes the worker pool from Redis queue metrics"""
+
+    def __init__(self, scaler, smoothing=0.5):
+        self.scaler = scaler
+        self.smoothing = smoothing
+        self.arrival_rate = 0.0
+        self._last_sample = None
+        self._last_scale_change = 0.0
+
+    def _service_time(self):
+        samples = metrics.get_service_times()
+        return median(samples) if samples else settings.AUTOSCALE_DEFAULT_SERVICE_TIME_S
+
+    def _model_load_time(self):
+        samples = metrics.get_model_load_times()
+        return max(samples) if samples else settings.AUTOSCALE_DEFAULT_MODEL_LOAD_S
+
+    def _update_arrival_rate(self, now, queue_depth, completed):
+        if self._last_sample is not None:
+            last_time, last_depth, last_completed = self._last_sample
+            elapsed = now - last_time
+            if elapsed > 0:
+                # Everything that arrived either is still queued or was completed
+                arrived = (queue_depth - last_depth) + (completed - last_completed)
+                rate = max(0.0, arrived / elapsed)
+                self.arrival_rate = self.smoothing * rate + (1 - self.smoothing) * self.arrival_rate
+
+        self._last_sample = (now, queue_depth, completed)
+
+    def step(self, now=None):
+        """
+        Run one control iteration
+
+        Returns:
+            status: Dictionary with the metrics and the scaling decision
+        """
+        now = time.time() if now is None else now
+
+        queue_depth = metrics.get_queue_depth()
+        completed = metrics.get_tasks_completed()
+        self._update_arrival_rate(now, queue_depth, completed)
+
+        service_time = self._service_time()
+        model_load_time = self._model_load_time()
+        current = self.scaler.current()
+
+        target = desired_workers(queue_depth, self.arrival_rate, service_time, model_load_time, current)
+
+        if target > current:
+            self.scaler.scale(target)
+            self._last_scale_change = now
+        elif target < current:
+            # Scale down one worker at a time, only with an empty queue and not right after a burst
+            cooled_down = now - self._last_scale_change >= settings.AUTOSCALE_SCALE_DOWN_COOLDOWN_S
+            if cooled_down and queue_depth == 0:
+                target = current - 1
+                self.scaler.scale(target)
+                self._last_scale_change = now
+            else:
+                target = current
+
+        return {
+            "queue_depth": queue_depth,
+            "arrival_rate": self.arrival_rate,
+            "service_time": service_time,
+            "model_load_time": model_load_time,
+            "workers": current,
+            "target_workers": target,
+        }
+
+    def run(self, interval=None):
+        interval = interval or settings.AUTOSCALE_POLL_INTERVAL_S
+
+        while True:
+            status = self.step()
+            print(
+                f"queue={status['queue_depth']} rate={status['arrival_rate']:.2f}/s "
+                f"service={status['service_time']:.1f}s load={status['model_load_time']:.1f}s "
+                f"workers={status['workers']}->{status['target_workers']}"
+            )
+            time.sleep(interval)
@@ -5,17 +5,40 @@ import base64
 from matplotlib.lines import Line2D
 from core.config import settings
 
-def calculate_cdf(masks, pixel_size_mm=None):
+def calculate_cdf(masks, pixel_size_mm=None, plot=True):
     """
     Calculate CDF of fragment sizes
     
     Args:
         masks: Boolean array of shape (N, H, W) where N is the number of instances
         pixel_size_mm: Size of one pixel in mm (default: from settings)
+        plot: Whether to render the CDF plot
     
     Returns:
         stats: Dictionary of CDF statistics
-        cdf_plot_base64: Base64 encoded CDF plot
+        cdf_plot_base64: Base64 encoded CDF plot, or None if plot is False
+    """
+    # Calculate areas in pixels
+    areas_px = masks.sum(axis=(1, 2))
+    
+    return calculate_cdf_from_areas(areas_px, pixel_size_mm, plot)
+
+def calculate_cdf_from_areas(areas_px, pixel_size_mm=None, plot=True):
+    """
+    Calculate CDF of fragment sizes from pixel areas
+    
+    Pixel areas do not depend on the scale, so a stored result can be
+    rescaled to a new pixel size without running the model again.
+    
+    Args:
+        areas_px: Array of shape (N,) with the area of each fragment in pixels
+        pixel_size_mm: Size of one pixel in mm (default: from settings)
+        plot: Whether to render the CDF plot
+    
+    Returns:
+        stats: Dictionary of CDF statistics
+        cdf_plot_base64: Base64 encoded CDF plot, or None if plot is False
+                         or there are no fragments
     """
     # Use default pixel size if not provided
     if pixel_size_mm is None:
@@ -24,8 +47,7 @@ def calculate_cdf(masks, pixel_size_mm=None):
     # Convert mm to cm
     pixel_size_cm = pixel_size_mm / 10.0
     
-    # Calculate areas in pixels
-    areas_px = masks.sum(axis=(1, 2))
+    areas_px = np.asarray(areas_px, dtype=np.float64)
     
     # Convert to cm²
     areas_cm2 = areas_px * (pixel_size_cm**2)
@@ -36,9 +58,59 @@ def calculate_cdf(masks, pixel_size_mm=None):
     # Number of fragments
     N = diam_cm.size
     
+    # An empty belt or a quiet pile has no fragments, report zeros and no plot
+    if N == 0:
+        stats = {key: 0.0 for key in ('Dmin', 'D10', 'D50', 'D80', 'D90', 'Average', 'Dmax')}
+        stats.update({
+            'N': 0,
+            'diameters_cm': [],
+            'areas_px': [],
+            'pixel_size_mm': float(pixel_size_mm)
+        })
+        return stats, None
+    
     # Sort diameters
     d_sorted = np.sort(diam_cm)
     
+    # Calculate key statistics
+    Dmin, Dmax, Dmean = d_sorted[0], d_sorted[-1], d_sorted.mean()
+    D10, D50, D80, D90 = np.percentile(d_sorted, [10, 50, 80, 90])
+    
+    # Rendering is the slowest part, skip it when only the numbers are needed
+    cdf_plot_base64 = plot_cdf(d_sorted, Dmin, Dmax, Dmean, D10, D50, D90) if plot else None
+    
+    # Prepare statistics
+    stats = {
+        'N': int(N),
+        'Dmin': float(Dmin),
+        'D10': float(D10),
+        'D50': float(D50),
+        'D80': float(D80),
+        'D90': float(D90),
+        'Average': float(Dmean),
+        'Dmax': float(Dmax),
+        'diameters_cm': diam_cm.tolist(),  # Convert to list for JSON serialization
+        'areas_px': areas_px.astype(int).tolist(),  # Scale-free measurements for rescaling
+        'pixel_size_mm': float(pixel_size_mm)
+    }
+    
+    return stats, cdf_plot_base64
+
+
+def plot_cdf(d_sorted, Dmin, Dmax, Dmean, D10, D50, D90):
+    """
+    Plot the CDF of fragment sizes
+    
+    Args:
+        d_sorted: Sorted fragment diameters in cm
+        Dmin, Dmax, Dmean, D10, D50, D90: Key statistics in cm
+    
+    Returns:
+        cdf_plot_base64: Base64 encoded CDF plot
+    """
+    # Number of fragments
+    N = d_sorted.size
+    
     # Calculate CDF values
     y_full = np.arange(1, N+1)/N * 100
     
@@ -46,10 +118,6 @@ def calculate_cdf(masks, pixel_size_mm=None):
     d_plot = np.concatenate([[0.0], d_sorted])
     y_plot = np.concatenate([[0.0], y_full])
     
-    # Calculate key statistics
-    Dmin, Dmax, Dmean = d_sorted[0], d_sorted[-1], d_sorted.mean()
-    D10, D50, D90 = np.percentile(d_sorted, [10, 50, 90])
-    
     # Create CDF plot
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -110,16 +178,4 @@ def calculate_cdf(masks, pixel_size_mm=None):
     buf.seek(0)
     cdf_plot_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
     
-    # Prepare statistics
-    stats = {
-        'N': int(N),
-        'Dmin': float(Dmin),
-        'D10': float(D10),
-        'D50': float(D50),
-        'D90': float(D90),
-        'Average': float(Dmean),
-        'Dmax': float(Dmax),
-        'diameters_cm': diam_cm.tolist()  # Convert to list for JSON serialization
-    }
-    
-    return stats, cdf_plot_base64
+    return cdf_plot_base64
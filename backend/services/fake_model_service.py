@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+import cv2
+import torch
+from detectron2.structures import Instances
+
+from core.config import settings
+
+def make_synthetic_masks(height, width, fragments, rng=None):
+    """
+    Create synthetic fragment masks
+
+    Args:
+        height: Image height
+        width: Image width
+        fragments: Number of masks to create
+        rng: numpy random Generator (default: new unseeded generator)
+
+    Returns:
+        masks: Boolean array of shape (fragments, height, width)
+    """
+    rng = rng or np.random.default_rng()
+    masks = np.zeros((fragments, height, width), dtype=np.uint8)
+
+    # Log-normal sizes give a CDF shaped like a real muck pile
+    max_radius = max(2, min(height, width) // 8)
+    radii = np.clip(rng.lognormal(np.log(max_radius / 4), 0.5, fragments), 2, max_radius).astype(int)
+
+    for i, radius in enumerate(radii):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(radius), int(max(1, radius * rng.uniform(0.5, 1.0))))
+        cv2.ellipse(masks[i], center, axes, float(rng.uniform(0, 180)), 0, 360, 1, -1)
+
+    return masks.astype(bool)
+
+def predict_image(image_bgr):
+    """
+    Stand-in for model_service.predict_image with tunable latency and fragment count
+
+    Args:
+        image_bgr: OpenCV image in BGR format
+
+    Returns:
+        instances: Detectron2 instances object with synthetic masks
+    """
+    height, width = image_bgr.shape[:2]
+
+    # Simulate model compute
+    jitter = settings.FAKE_MODEL_JITTER
+    time.sleep(max(0.0, settings.FAKE_MODEL_LATENCY_S * (1 + np.random.uniform(-jitter, jitter))))
+
+    masks = make_synthetic_masks(height, width, settings.FAKE_MODEL_FRAGMENTS)
+
+    instances = Instances((height, width))
+    instances.pred_masks = torch.from_numpy(masks)
+    instances.scores = torch.ones(len(masks))
+
+    return instances
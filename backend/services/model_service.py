@@ -5,10 +5,13 @@ import cv2
 from detectron2.config import get_cfg
 from detectron2 import model_zoo
 from detectron2.engine import DefaultPredictor
+from detectron2.structures import Instances, Boxes
+import detectron2.data.transforms as T
 import time
 from functools import lru_cache
 
 from core.config import settings
+from core.metrics import record_model_load_time
 
 # Global variable to store the predictor
 _predictor = None
@@ -45,7 +48,9 @@ def get_predictor():
         # Create predictor
         _predictor = DefaultPredictor(cfg)
         
-        print(f"Model loaded in {time.time() - start_time:.2f} seconds")
+        load_time = time.time() - start_time
+        record_model_load_time(load_time)
+        print(f"Model loaded in {load_time:.2f} seconds")
     
     return _predictor
 
@@ -61,6 +66,11 @@ def predict_image(image_bgr):
     Returns:
         instances: Detectron2 instances object
     """
+    # Use the stand-in model when load testing
+    if settings.FAKE_MODEL:
+        from services import fake_model_service
+        return fake_model_service.predict_image(image_bgr)
+    
     # Get predictor
     predictor = get_predictor()
     
@@ -71,3 +81,203 @@ def predict_image(image_bgr):
     instances = outputs["instances"].to("cpu")
     
     return instances
+
+def fixed_scale_info():
+    """Scale used by predict_image, in the same form as predict_image_adaptive reports"""
+    if settings.FAKE_MODEL:
+        return {"mode": "fixed"}
+    
+    return {"mode": "fixed", "short_edge": get_predictor().cfg.INPUT.MIN_SIZE_TEST}
+
+def _scale_factor(height, width, short_edge, max_size):
+    """Resize factor ResizeShortestEdge applies for a given shortest edge"""
+    return min(short_edge / min(height, width), max_size / max(height, width))
+
+def _run_at_scale(predictor, image_bgr, short_edge):
+    """
+    Run the model with the image resized to a given shortest edge
+    Same as DefaultPredictor.__call__, with the resize chosen per call
+    
+    Returns:
+        instances: Detectron2 instances object, masks at the input image size
+    """
+    with torch.no_grad():
+        image = image_bgr[:, :, ::-1] if predictor.input_format == "RGB" else image_bgr
+        height, width = image.shape[:2]
+        
+        aug = T.ResizeShortestEdge([short_edge, short_edge], predictor.cfg.INPUT.MAX_SIZE_TEST)
+        resized = aug.get_transform(image).apply_image(image)
+        tensor = torch.as_tensor(resized.astype("float32").transpose(2, 0, 1))
+        
+        outputs = predictor.model([{"image": tensor, "height": height, "width": width}])[0]
+    
+    return outputs["instances"].to("cpu")
+
+def _tile_ranges(length, tile, overlap_px):
+    """Start and end of tiles overlapping by overlap_px covering [0, length)"""
+    if tile >= length:
+        return [(0, length)]
+    
+    step = max(1, tile - overlap_px)
+    starts = list(range(0, length - tile, step)) + [length - tile]
+    return [(start, start + tile) for start in starts]
+
+def _tile_overlap(tile, max_fragment_px):
+    """
+    Overlap between tiles in pixels
+    
+    At least the largest fragment, so every fragment whose box center is in a
+    tile's core lies entirely inside that tile and is not clipped at its edge.
+    """
+    return max(int(tile * settings.ADAPTIVE_TILE_OVERLAP), int(np.ceil(max_fragment_px)))
+
+def _count_tiles(height, width, tile, max_fragment_px=0):
+    overlap_px = _tile_overlap(tile, max_fragment_px)
+    return len(_tile_ranges(height, tile, overlap_px)) * len(_tile_ranges(width, tile, overlap_px))
+
+def _tile_cores(ranges, length):
+    """Core of each tile, split halfway through the overlap with its neighbours"""
+    cores = []
+    for i, (start, end) in enumerate(ranges):
+        core_start = (start + ranges[i - 1][1]) / 2 if i > 0 else 0
+        core_end = (end + ranges[i + 1][0]) / 2 if i + 1 < len(ranges) else length
+        cores.append((core_start, core_end))
+    return cores
+
+def _run_tiled(predictor, image_bgr, tile_size, short_edge, max_fragment_px=0):
+    """
+    Run the model on overlapping tiles and merge them into one set of instances
+    
+    An instance is kept by the tile whose core (the tile minus half the overlap
+    on inner edges) contains its box center, so fragments in the overlap are
+    not counted twice.
+    
+    Returns:
+        instances: Detectron2 instances object
+        clipped: Number of kept instances whose box touches an inner tile edge,
+                 i.e. fragments larger than the probe predicted that may be cut off
+    """
+    height, width = image_bgr.shape[:2]
+    overlap_px = _tile_overlap(tile_size, max_fragment_px)
+    
+    masks, boxes, scores = [], [], []
+    clipped = 0
+    y_ranges = _tile_ranges(height, tile_size, overlap_px)
+    x_ranges = _tile_ranges(width, tile_size, overlap_px)
+    y_cores = _tile_cores(y_ranges, height)
+    x_cores = _tile_cores(x_ranges, width)
+    
+    for (y0, y1), (cy0, cy1) in zip(y_ranges, y_cores):
+        for (x0, x1), (cx0, cx1) in zip(x_ranges, x_cores):
+            tile_instances = _run_at_scale(predictor, np.ascontiguousarray(image_bgr[y0:y1, x0:x1]), short_edge)
+            
+            tile_boxes = tile_instances.pred_boxes.tensor + torch.tensor([x0, y0, x0, y0])
+            centers = tile_boxes.view(-1, 2, 2).mean(dim=1)
+            keep = (
+                (centers[:, 0] >= cx0) & (centers[:, 0] < cx1) &
+                (centers[:, 1] >= cy0) & (centers[:, 1] < cy1)
+            )
+            
+            # Edges shared with a neighbouring tile, where a fragment would be cut off
+            touches = (
+                ((tile_boxes[:, 0] <= x0) & (x0 > 0)) | ((tile_boxes[:, 2] >= x1) & (x1 < width)) |
+                ((tile_boxes[:, 1] <= y0) & (y0 > 0)) | ((tile_boxes[:, 3] >= y1) & (y1 < height))
+            )
+            clipped += int((keep & touches).sum())
+            
+            for i in torch.nonzero(keep).flatten().tolist():
+                full_mask = torch.zeros((height, width), dtype=torch.bool)
+                full_mask[y0:y1, x0:x1] = tile_instances.pred_masks[i]
+                masks.append(full_mask)
+                boxes.append(tile_boxes[i])
+                scores.append(tile_instances.scores[i])
+    
+    instances = Instances((height, width))
+    instances.pred_masks = torch.stack(masks) if masks else torch.zeros((0, height, width), dtype=torch.bool)
+    instances.pred_boxes = Boxes(torch.stack(boxes) if boxes else torch.zeros((0, 4)))
+    instances.scores = torch.stack(scores) if scores else torch.zeros(0)
+    
+    return instances, clipped
+
+def predict_image_adaptive(image_bgr):
+    """
+    Run inference at the smallest scale that keeps the smallest fragments resolvable
+    
+    A low-resolution pass estimates fragment sizes. The smallest candidate scale
+    that makes the small fragments at least ADAPTIVE_MIN_FRAGMENT_PX wide is then
+    used; if even the largest candidate is not enough, the image is tiled.
+    
+    Args:
+        image_bgr: OpenCV image in BGR format
+    
+    Returns:
+        instances: Detectron2 instances object
+        scale_info: Dictionary describing the chosen inference scale
+    """
+    # The stand-in model has no notion of scale
+    if settings.FAKE_MODEL:
+        return predict_image(image_bgr), fixed_scale_info()
+    
+    predictor = get_predictor()
+    height, width = image_bgr.shape[:2]
+    max_size = predictor.cfg.INPUT.MAX_SIZE_TEST
+    probe_size = settings.ADAPTIVE_PROBE_SIZE
+    
+    # Cheap pass, masks come back at full image resolution
+    probe = _run_at_scale(predictor, image_bgr, probe_size)
+    
+    if len(probe) == 0:
+        # Nothing resolvable at low resolution, fall back to the configured scale
+        short_edge = predictor.cfg.INPUT.MIN_SIZE_TEST
+        instances = _run_at_scale(predictor, image_bgr, short_edge)
+        return instances, {
+            "mode": "fixed",
+            "short_edge": short_edge,
+            "scale_factor": _scale_factor(height, width, short_edge, max_size),
+            "probe_fragments": 0
+        }
+    
+    # Equivalent diameter of the small fragments, in original image pixels
+    diameters = np.sqrt(probe.pred_masks.sum(dim=(1, 2)).numpy())
+    small_px = float(np.percentile(diameters, settings.ADAPTIVE_SMALL_PERCENTILE))
+    needed_factor = settings.ADAPTIVE_MIN_FRAGMENT_PX / max(small_px, 1.0)
+    
+    scale_info = {
+        "probe_fragments": len(probe),
+        "small_fragment_px": small_px
+    }
+    
+    for short_edge in sorted(settings.ADAPTIVE_SCALES):
+        factor = _scale_factor(height, width, short_edge, max_size)
+        if factor >= needed_factor:
+            # Reuse the probe if it already was at this scale
+            instances = probe if short_edge == probe_size else _run_at_scale(predictor, image_bgr, short_edge)
+            scale_info.update({"mode": "resize", "short_edge": short_edge, "scale_factor": factor})
+            return instances, scale_info
+    
+    # Even the largest scale is too coarse: tile so each tile is resized to it
+    short_edge = max(settings.ADAPTIVE_SCALES)
+    
+    # Tiles overlap by the largest fragment, so they must be at least twice its size
+    box_sizes = probe.pred_boxes.tensor[:, 2:] - probe.pred_boxes.tensor[:, :2]
+    max_fragment_px = float(box_sizes.max())
+    tile_size = max(int(short_edge / needed_factor), int(np.ceil(2 * max_fragment_px)), 1)
+    tiles = _count_tiles(height, width, tile_size, max_fragment_px)
+    
+    # Grow tiles until the count fits, giving up some resolution
+    while tiles > settings.ADAPTIVE_MAX_TILES:
+        tile_size = int(tile_size * 1.25) + 1
+        tiles = _count_tiles(height, width, tile_size, max_fragment_px)
+    
+    instances, clipped = _run_tiled(predictor, image_bgr, tile_size, short_edge, max_fragment_px)
+    scale_info.update({
+        "mode": "tiled",
+        "short_edge": short_edge,
+        "tile_size": tile_size,
+        "tiles": tiles,
+        "tile_overlap": _tile_overlap(tile_size, max_fragment_px),
+        "clipped_fragments": clipped,
+        "scale_factor": _scale_factor(tile_size, tile_size, short_edge, max_size)
+    })
+    
+    return instances, scale_info
@@ -0,0 +1,318 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+from core.config import settings
+
+# Log-spaced fragment size bins, so aggregate curves are a GROUP BY in SQLite
+BIN_MIN_CM = 0.1
+BIN_MAX_CM = 1000.0
+BINS_PER_DECADE = 50
+NUM_BINS = int(np.log10(BIN_MAX_CM / BIN_MIN_CM) * BINS_PER_DECADE)
+
+# SQL expressions grouping captured_at into trend periods. Weeks are labelled
+# by their Monday, since strftime's %W restarts at week 00 on January 1 and
+# would split a week across the year boundary.
+PERIOD_EXPRESSIONS = {
+    "day": "strftime('%Y-%m-%d', captured_at)",
+    "week": "date(captured_at, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', captured_at)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    task_id TEXT UNIQUE NOT NULL,
+    site_id TEXT,
+    blast_id TEXT,
+    captured_at TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    dmin REAL, d10 REAL, d50 REAL, d80 REAL, d90 REAL, dmean REAL, dmax REAL,
+    processing_time REAL,
+    pixel_size_mm REAL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_site_time ON images (site_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_images_blast ON images (blast_id);
+CREATE INDEX IF NOT EXISTS idx_images_time ON images (captured_at);
+
+CREATE TABLE IF NOT EXISTS fragments (
+    image_id INTEGER NOT NULL REFERENCES images (id),
+    size_bin INTEGER NOT NULL,
+    area_px INTEGER NOT NULL,
+    diameter_cm REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fragments_image_bin ON fragments (image_id, size_bin);
+"""
+
+_initialized = set()
+
+@contextmanager
+def get_connection(db_path=None):
+    """
+    Open a connection to the results store, creating the schema on first use
+
+    WAL mode lets the API read while workers write. WAL needs shared memory,
+    so the file can only be shared by processes on one host; workers on other
+    nodes cannot write to it through a network or bind-mounted volume.
+    """
+    db_path = db_path or settings.RESULTS_DB_PATH
+
+    if db_path not in _initialized:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if db_path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _initialized.add(db_path)
+        conn.row_factory = sqlite3.Row
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+def size_bins(diameters_cm):
+    """Bin index of each diameter in the log-spaced size bins"""
+    diameters = np.clip(np.asarray(diameters_cm, dtype=np.float64), BIN_MIN_CM, BIN_MAX_CM)
+    bins = np.floor(np.log10(diameters / BIN_MIN_CM) * BINS_PER_DECADE).astype(int)
+    return np.clip(bins, 0, NUM_BINS - 1)
+
+def bin_upper_edge(size_bin):
+    """Upper diameter edge of a size bin in cm"""
+    return BIN_MIN_CM * 10 ** ((size_bin + 1) / BINS_PER_DECADE)
+
+def normalize_timestamp(value=None):
+    """
+    Convert a timestamp to the ISO 8601 UTC text stored in the database
+
+    Args:
+        value: ISO 8601 string, datetime or None for now
+
+    Returns:
+        timestamp: 'YYYY-MM-DDTHH:MM:SS' in UTC
+    """
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif isinstance(value, str):
+        # fromisoformat only accepts a trailing Z from Python 3.11
+        if value.endswith(("Z", "z")):
+            value = value[:-1] + "+00:00"
+        value = datetime.fromisoformat(value)
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return value.isoformat(timespec="seconds")
+
+def save_result(task_id, result, site_id=None, blast_id=None, captured_at=None, db_path=None):
+    """
+    Store the summary stats and per-fragment measurements of one image
+
+    Args:
+        task_id: Celery task ID of the image
+        result: Result dictionary of process_image
+        site_id: Site identifier
+        blast_id: Blast identifier
+        captured_at: When the image was taken (default: now)
+    """
+    stats = result["stats"]
+
+    with get_connection(db_path) as conn:
+        # Replace any earlier copy of the same task
+        conn.execute(
+            "DELETE FROM fragments WHERE image_id IN (SELECT id FROM images WHERE task_id = ?)", (task_id,)
+        )
+        conn.execute("DELETE FROM images WHERE task_id = ?", (task_id,))
+
+        cursor = conn.execute(
+            """
+            INSERT INTO images (
+                task_id, site_id, blast_id, captured_at, n,
+                dmin, d10, d50, d80, d90, dmean, dmax,
+                processing_time, pixel_size_mm, model_version
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                task_id, site_id, blast_id, normalize_timestamp(captured_at), stats["N"],
+                stats["Dmin"], stats["D10"], stats["D50"], stats.get("D80"), stats["D90"],
+                stats["Average"], stats["Dmax"],
+                result.get("processing_time"), stats.get("pixel_size_mm"), settings.MODEL_VERSION
+            )
+        )
+        _insert_fragments(conn, cursor.lastrowid, stats)
+
+def rescale_result(task_id, stats, db_path=None):
+    """
+    Replace the stored stats and fragment sizes of an image after a rescale
+
+    Args:
+        task_id: Celery task ID of the image
+        stats: Stats from calculate_cdf_from_areas at the new pixel size
+
+    Returns:
+        updated: Whether the task was in the store
+    """
+    with get_connection(db_path) as conn:
+        row = conn.execute("SELECT id FROM images WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return False
+
+        conn.execute(
+            """
+            UPDATE images
+            SET n = ?, dmin = ?, d10 = ?, d50 = ?, d80 = ?, d90 = ?, dmean = ?, dmax = ?, pixel_size_mm = ?
+            WHERE id = ?
+            """,
+            (
+                stats["N"], stats["Dmin"], stats["D10"], stats["D50"], stats.get("D80"), stats["D90"],
+                stats["Average"], stats["Dmax"], stats.get("pixel_size_mm"), row["id"]
+            )
+        )
+        # Size bins depend on the scale, so the fragments are written again
+        conn.execute("DELETE FROM fragments WHERE image_id = ?", (row["id"],))
+        _insert_fragments(conn, row["id"], stats)
+
+    return True
+
+def _insert_fragments(conn, image_id, stats):
+    """Insert the per-fragment measurements of one image"""
+    diameters = np.asarray(stats["diameters_cm"], dtype=np.float64)
+    areas = np.asarray(stats["areas_px"], dtype=np.int64)
+
+    conn.executemany(
+        "INSERT INTO fragments (image_id, size_bin, area_px, diameter_cm) VALUES (?, ?, ?, ?)",
+        zip([image_id] * len(diameters), size_bins(diameters).tolist(), areas.tolist(), diameters.tolist())
+    )
+
+def _filters(site_id=None, blast_id=None, start=None, end=None):
+    """Build the WHERE clause shared by all queries"""
+    clauses, params = [], []
+
+    if site_id is not None:
+        clauses.append("i.site_id = ?")
+        params.append(site_id)
+    if blast_id is not None:
+        clauses.append("i.blast_id = ?")
+        params.append(blast_id)
+    if start is not None:
+        clauses.append("i.captured_at >= ?")
+        params.append(normalize_timestamp(start))
+    if end is not None:
+        clauses.append("i.captured_at < ?")
+        params.append(normalize_timestamp(end))
+
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+def query_images(site_id=None, blast_id=None, start=None, end=None, limit=100, offset=0, db_path=None):
+    """List per-image summaries, newest first"""
+    where, params = _filters(site_id, blast_id, start, end)
+
+    with get_connection(db_path) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT task_id, site_id, blast_id, captured_at, n, dmin, d10, d50, d80, d90, dmean, dmax,
+                   processing_time, pixel_size_mm, model_version
+            FROM images i {where}
+            ORDER BY captured_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            params + [limit, offset]
+        ).fetchall()
+
+    return [dict(row) for row in rows]
+
+def _percentile_from_histogram(bins, counts, pct):
+    """Interpolate a percentile in log space within the size bin where it falls"""
+    cumulative = np.cumsum(counts)
+    target = cumulative[-1] * pct / 100.0
+    i = int(np.searchsorted(cumulative, target))
+
+    below = cumulative[i - 1] if i > 0 else 0
+    fraction = (target - below) / counts[i] if counts[i] else 0.0
+
+    return BIN_MIN_CM * 10 ** ((bins[i] + fraction) / BINS_PER_DECADE)
+
+def aggregate_curve(site_id=None, blast_id=None, start=None, end=None, db_path=None):
+    """
+    Aggregate fragment size CDF over all matching images
+
+    The histogram is computed in SQLite from the stored size bins, so only
+    one row per bin leaves the database.
+
+    Returns:
+        curve: Dictionary with image and fragment counts, D-values and CDF points
+    """
+    where, params = _filters(site_id, blast_id, start, end)
+
+    with get_connection(db_path) as conn:
+        images = conn.execute(f"SELECT COUNT(*) FROM images i {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"""
+            SELECT f.size_bin, COUNT(*) AS count
+            FROM images i JOIN fragments f ON f.image_id = i.id
+            {where}
+            GROUP BY f.size_bin
+            ORDER BY f.size_bin
+            """,
+            params
+        ).fetchall()
+
+    if not rows:
+        return {"images": images, "fragments": 0, "stats": {}, "cdf": []}
+
+    bins = np.array([row["size_bin"] for row in rows])
+    counts = np.array([row["count"] for row in rows])
+    total = int(counts.sum())
+    cumulative_pct = np.cumsum(counts) / total * 100
+
+    stats = {
+        f"D{pct}": float(_percentile_from_histogram(bins, counts, pct))
+        for pct in (10, 50, 80, 90)
+    }
+
+    return {
+        "images": images,
+        "fragments": total,
+        "stats": stats,
+        "cdf": [
+            {"diameter_cm": float(bin_upper_edge(b)), "cumulative_pct": float(p)}
+            for b, p in zip(bins, cumulative_pct)
+        ]
+    }
+
+def trend(period="day", site_id=None, blast_id=None, start=None, end=None, db_path=None):
+    """
+    Per-period averages of the image summary stats
+
+    Args:
+        period: "day", "week" (labelled by its Monday) or "month"
+
+    Returns:
+        points: List of per-period summaries in time order
+    """
+    if period not in PERIOD_EXPRESSIONS:
+        raise ValueError(f"Unknown period: {period}")
+
+    where, params = _filters(site_id, blast_id, start, end)
+
+    with get_connection(db_path) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {PERIOD_EXPRESSIONS[period]} AS period,
+                   COUNT(*) AS images, SUM(n) AS fragments,
+                   AVG(d10) AS d10, AVG(d50) AS d50, AVG(d80) AS d80, AVG(d90) AS d90,
+                   AVG(processing_time) AS processing_time
+            FROM images i {where}
+            GROUP BY period
+            ORDER BY period
+            """,
+            params
+        ).fetchall()
+
+    return [dict(row) for row in rows]
@@ -0,0 +1,116 @@
+import numpy as np
+import cv2
+
+from core.config import settings
+
+def _marker_masks(image_bgr):
+    """
+    Binary images in which the scale bar is a foreground blob
+    
+    With SCALE_BAR_HSV_RANGE set, only pixels of the marker colour are kept.
+    Otherwise Otsu thresholding is used, in both polarities since a bar can be
+    darker or lighter than the background.
+    """
+    if settings.SCALE_BAR_HSV_RANGE:
+        lower = np.array(settings.SCALE_BAR_HSV_RANGE[:3], dtype=np.uint8)
+        upper = np.array(settings.SCALE_BAR_HSV_RANGE[3:], dtype=np.uint8)
+        hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
+        return [cv2.inRange(hsv, lower, upper)]
+    
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return [binary, cv2.bitwise_not(binary)]
+
+def detect_scale_bar(image_bgr, roi=None):
+    """
+    Detect a scale bar or reference object in an image
+    
+    Looks for the longest elongated, filled contour, which is how a scale bar
+    or measuring stick placed on the muck pile shows up. Elongated rocks,
+    shadows and belt edges look the same to this test, so restrict the search
+    with a region of interest or a marker colour (SCALE_BAR_HSV_RANGE) where
+    possible, and check the returned box.
+    
+    Args:
+        image_bgr: OpenCV image in BGR format
+        roi: Optional (x, y, w, h) region to search, in image pixels
+    
+    Returns:
+        detection: Dictionary with length_px and box (4 corner points in image
+                   pixels), or None if not found
+    """
+    offset = np.array([0.0, 0.0])
+    if roi is not None:
+        x, y, w, h = [int(v) for v in roi]
+        image_bgr = image_bgr[max(y, 0):y + h, max(x, 0):x + w]
+        offset = np.array([max(x, 0), max(y, 0)], dtype=np.float64)
+        if image_bgr.size == 0:
+            return None
+    
+    best = None
+    height, width = image_bgr.shape[:2]
+    
+    for candidate in _marker_masks(image_bgr):
+        contours, _ = cv2.findContours(candidate, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        for contour in contours:
+            # The bar lies fully inside the search area, so skip background
+            # regions and edges (belt edges, cut-off rocks) touching the border
+            bx, by, bw, bh = cv2.boundingRect(contour)
+            if bx == 0 or by == 0 or bx + bw >= width or by + bh >= height:
+                continue
+            
+            rect = cv2.minAreaRect(contour)
+            (w, h) = rect[1]
+            length, thickness = max(w, h), min(w, h)
+            
+            if thickness < 1 or length < settings.SCALE_BAR_MIN_LENGTH_PX:
+                continue
+            if length / thickness < settings.SCALE_BAR_MIN_ASPECT:
+                continue
+            
+            # A scale bar fills most of its bounding rectangle
+            if cv2.contourArea(contour) < 0.7 * length * thickness:
+                continue
+            
+            if best is None or length > best["length_px"]:
+                box = cv2.boxPoints(rect) + offset
+                best = {"length_px": float(length), "box": box.round(1).tolist()}
+    
+    return best
+
+def resolve_pixel_size(image_bgr=None, pixel_size_mm=None, site_id=None, reference_length_mm=None, roi=None):
+    """
+    Resolve the pixel size to use for an image
+    
+    Priority: explicit pixel size, then reference object detected in the image,
+    then the per-site calibration, then the global default.
+    
+    Args:
+        image_bgr: OpenCV image in BGR format (only needed for reference detection)
+        pixel_size_mm: Explicit size of one pixel in mm
+        site_id: Site identifier to look up in settings.SITE_PIXEL_SIZE_MM
+        reference_length_mm: Real length of the scale bar in the image, in mm
+        roi: Optional (x, y, w, h) region to search for the scale bar
+    
+    Returns:
+        pixel_size_mm: Size of one pixel in mm
+        source: Where the pixel size came from
+        calibration: Scale bar detection (length_px, box, roi, reference_length_mm)
+                     for auditing, or None if no scale bar was used
+    """
+    if pixel_size_mm is not None:
+        return float(pixel_size_mm), "request", None
+    
+    if reference_length_mm is not None and image_bgr is not None:
+        detection = detect_scale_bar(image_bgr, roi)
+        if detection:
+            calibration = {**detection, "roi": roi, "reference_length_mm": float(reference_length_mm)}
+            return float(reference_length_mm) / detection["length_px"], "reference", calibration
+        print("Scale bar not found, falling back to site or default pixel size")
+    
+    if site_id is not None and site_id in settings.SITE_PIXEL_SIZE_MM:
+        return float(settings.SITE_PIXEL_SIZE_MM[site_id]), "site", None
+    
+    return float(settings.PIXEL_SIZE_MM), "default", None
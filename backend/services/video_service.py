@@ -0,0 +1,192 @@
+import json
+from collections import deque
+
+import numpy as np
+import cv2
+
+from core.config import settings
+from core.metrics import get_redis
+
+# Redis key prefix for video jobs
+VIDEO_JOB_KEY = "video:{job_id}"
+
+def dhash(image_bgr, hash_size=8):
+    """
+    Compute a difference hash of an image
+
+    Args:
+        image_bgr: OpenCV image in BGR format
+        hash_size: Hash is hash_size * hash_size bits
+
+    Returns:
+        hash: Boolean array of shape (hash_size * hash_size,)
+    """
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).flatten()
+
+def motion_score(prev_gray, gray):
+    """Mean absolute difference between two small grayscale frames (0-255)"""
+    return float(cv2.absdiff(prev_gray, gray).mean())
+
+class FrameSampler:
+    """
+    Decide which frames go to the model
+
+    Frames are considered at most once per interval. In "motion" mode a frame is
+    only kept if it differs enough from the last kept frame. In both modes frames
+    whose perceptual hash is close to a recently kept frame are skipped as duplicates.
+    """
+
+    def __init__(self, mode="time", interval_s=None, motion_threshold=None, hash_distance=None, history=8):
+        if mode not in ("time", "motion"):
+            raise ValueError(f"Unknown sampling mode: {mode}")
+
+        self.mode = mode
+        self.interval_s = settings.VIDEO_SAMPLE_INTERVAL_S if interval_s is None else interval_s
+        self.motion_threshold = settings.VIDEO_MOTION_THRESHOLD if motion_threshold is None else motion_threshold
+        self.hash_distance = settings.VIDEO_HASH_DISTANCE if hash_distance is None else hash_distance
+        self.recent_hashes = deque(maxlen=history)
+        self.last_time_s = None
+        self.last_gray = None
+        self.skipped_duplicates = 0
+        self.skipped_static = 0
+
+    def due(self, time_s):
+        """Whether a frame at time_s should be decoded and checked at all"""
+        return self.last_time_s is None or time_s - self.last_time_s >= self.interval_s
+
+    def accept(self, time_s, frame_bgr):
+        """Whether a decoded frame should be sent to the model"""
+        self.last_time_s = time_s
+
+        gray = None
+        if self.mode == "motion":
+            gray = cv2.resize(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY), (64, 64), interpolation=cv2.INTER_AREA)
+            if self.last_gray is not None and motion_score(self.last_gray, gray) < self.motion_threshold:
+                self.skipped_static += 1
+                return False
+
+        frame_hash = dhash(frame_bgr)
+        for seen in self.recent_hashes:
+            if np.count_nonzero(frame_hash != seen) <= self.hash_distance:
+                self.skipped_duplicates += 1
+                return False
+
+        # Only kept frames become the motion and duplicate references
+        if gray is not None:
+            self.last_gray = gray
+        self.recent_hashes.append(frame_hash)
+        return True
+
+def iter_video_frames(path, sampler):
+    """
+    Stream frames from a video file, decoding only the frames the sampler wants
+
+    Args:
+        path: Path of the video file
+        sampler: FrameSampler deciding which frames to keep
+
+    Yields:
+        (time_s, frame_bgr) for every kept frame
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError("Could not open video")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    index = 0
+
+    try:
+        # grab() advances without converting the frame, retrieve() only for sampled frames
+        while capture.grab():
+            time_s = index / fps
+            index += 1
+
+            if not sampler.due(time_s):
+                continue
+
+            ok, frame = capture.retrieve()
+            if ok and sampler.accept(time_s, frame):
+                yield time_s, frame
+    finally:
+        capture.release()
+
+def iter_image_frames(images_bgr, frame_interval_s, sampler):
+    """
+    Apply the sampler to an ordered sequence of images
+
+    Args:
+        images_bgr: Iterable of OpenCV images in BGR format
+        frame_interval_s: Seconds between consecutive images
+        sampler: FrameSampler deciding which frames to keep
+
+    Yields:
+        (time_s, frame_bgr) for every kept frame
+    """
+    for index, frame in enumerate(images_bgr):
+        time_s = index * frame_interval_s
+        if sampler.due(time_s) and sampler.accept(time_s, frame):
+            yield time_s, frame
+
+def save_video_job(job_id, frames, sampler, truncated=False):
+    """
+    Store the frame tasks of a video job
+
+    Args:
+        job_id: Video job ID
+        frames: List of {"time_s": ..., "task_id": ...} in time order
+        sampler: FrameSampler used for the job
+        truncated: Whether frames were left out because of VIDEO_MAX_FRAMES
+    """
+    job = {
+        "frames": frames,
+        "truncated": truncated,
+        "mode": sampler.mode,
+        "skipped_duplicates": sampler.skipped_duplicates,
+        "skipped_static": sampler.skipped_static,
+    }
+    get_redis().set(VIDEO_JOB_KEY.format(job_id=job_id), json.dumps(job))
+
+def load_video_job(job_id):
+    """Load a stored video job, or None if it does not exist"""
+    data = get_redis().get(VIDEO_JOB_KEY.format(job_id=job_id))
+    return json.loads(data) if data else None
+
+def build_time_series(frames, results, window=None):
+    """
+    Build a rolling fragment-size time series from frame results
+
+    Args:
+        frames: List of {"time_s": ..., "task_id": ...} in time order
+        results: Dictionary of task ID to finished result
+        window: Number of frames in the rolling median (default: from settings)
+
+    Returns:
+        series: List of per-frame points with rolling D50 and D90
+    """
+    window = window or settings.VIDEO_ROLLING_WINDOW
+
+    series = []
+    recent_d50 = deque(maxlen=window)
+    recent_d90 = deque(maxlen=window)
+
+    for frame in frames:
+        result = results.get(frame["task_id"])
+        if result is None:
+            continue
+
+        stats = result["stats"]
+        recent_d50.append(stats["D50"])
+        recent_d90.append(stats["D90"])
+
+        series.append({
+            "time_s": frame["time_s"],
+            "N": stats["N"],
+            "D50": stats["D50"],
+            "D90": stats["D90"],
+            "rolling_D50": float(np.median(recent_d50)),
+            "rolling_D90": float(np.median(recent_d90)),
+        })
+
+    return series
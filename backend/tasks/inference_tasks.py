@@ -2,11 +2,16 @@ import numpy as np
 import time
 import cv2
 from celery import Task
+from celery.signals import worker_process_init, task_received
 
 from core.celery_app import celery_app
-from services.model_service import predict_image
+from core.config import settings
+from core.metrics import record_service_time, record_task_received, pop_task_received
+from services.model_service import predict_image, predict_image_adaptive, fixed_scale_info, get_predictor
 from services.visualization import create_visualization
 from services.cdf_service import calculate_cdf
+from services.scale_service import resolve_pixel_size
+from services.results_store import save_result
 
 class ModelTask(Task):
     """Task class that keeps the model in memory"""
@@ -18,21 +23,57 @@ class ModelTask(Task):
     def __call__(self, *args, **kwargs):
         """
         Override Task.__call__ to ensure the model is loaded
+        and to report the service time for autoscaling
         """
-        return self.run(*args, **kwargs)
+        start_time = time.time()
+        try:
+            return self.run(*args, **kwargs)
+        finally:
+            record_service_time(time.time() - start_time)
 
-@celery_app.task(base=ModelTask, name="tasks.inference_tasks.process_image")
-def process_image(image_list):
+@worker_process_init.connect
+def preload_model(**kwargs):
+    """
+    Load the model when a worker process starts, so a worker added by the
+    autoscaler is warm before it takes its first task
+    """
+    if settings.PRELOAD_MODEL and not settings.FAKE_MODEL:
+        get_predictor()
+
+@task_received.connect
+def mark_task_received(request=None, **kwargs):
+    """
+    Record when the worker consumer took a task off the broker, before the
+    payload is decoded and handed to a pool process
+    """
+    record_task_received(request.id, time.time())
+
+@celery_app.task(base=ModelTask, bind=True, name="tasks.inference_tasks.process_image")
+def process_image(self, image_list, pixel_size_mm=None, site_id=None, reference_length_mm=None, render=True,
+                  adaptive=None, blast_id=None, captured_at=None, store=True, scale_bar_roi=None):
     """
     Process an image with the Mask R-CNN model
     
     Args:
         image_list: List representation of a numpy array (BGR image)
+        pixel_size_mm: Size of one pixel in mm (overrides site and default scale)
+        site_id: Site identifier used to look up a per-site scale
+        reference_length_mm: Real length of a scale bar in the image, in mm
+        render: Whether to render the segmentation image and CDF plot
+        adaptive: Whether to choose the inference scale from image content
+                  (default: settings.ADAPTIVE_RESOLUTION)
+        blast_id: Blast identifier stored with the result
+        captured_at: ISO 8601 time the image was taken (default: now)
+        store: Whether to save the result in the results store
+        scale_bar_roi: Optional [x, y, w, h] region to search for the scale bar
     
     Returns:
         result: Dictionary with segmentation results
     """
     try:
+        # The payload is already JSON-decoded and passed to this pool process here
+        started_at = time.time()
+        
         # Convert list back to numpy array
         image_bgr = np.array(image_list, dtype=np.uint8)
         
@@ -40,16 +81,29 @@ def process_image(image_list):
         start_time = time.time()
         
         # Run inference
-        instances = predict_image(image_bgr)
+        if adaptive is None:
+            adaptive = settings.ADAPTIVE_RESOLUTION
+        if adaptive:
+            instances, inference_scale = predict_image_adaptive(image_bgr)
+        else:
+            instances, inference_scale = predict_image(image_bgr), fixed_scale_info()
+        inference_time = time.time() - start_time
         print(f"[DEBUG inference_tasks] Number of instances received: {len(instances)}")
         # Get masks
         masks = instances.pred_masks.numpy()
         
-        # Create visualization
-        visualization_base64 = create_visualization(image_bgr, instances)
+        # Create visualization (skipped for video frames, which only need stats)
+        visualization_base64 = create_visualization(image_bgr, instances) if render else None
         
-        # Calculate CDF
-        stats, cdf_plot_base64 = calculate_cdf(masks)
+        # Resolve scale and calculate CDF
+        pixel_size_mm, scale_source, scale_calibration = resolve_pixel_size(
+            image_bgr,
+            pixel_size_mm=pixel_size_mm,
+            site_id=site_id,
+            reference_length_mm=reference_length_mm,
+            roi=scale_bar_roi
+        )
+        stats, cdf_plot_base64 = calculate_cdf(masks, pixel_size_mm, plot=render)
         
         # Record end time
         processing_time = time.time() - start_time
@@ -60,9 +114,31 @@ def process_image(image_list):
             "cdf_plot": cdf_plot_base64,
             "fragment_count": len(masks),
             "stats": stats,
-            "processing_time": processing_time
+            "pixel_size_mm": pixel_size_mm,
+            "scale_source": scale_source,
+            "scale_calibration": scale_calibration,
+            "site_id": site_id,
+            "inference_scale": inference_scale,
+            "processing_time": processing_time,
+            "timings": {
+                # Consumer received the message (task_received signal), or None if unknown
+                "worker_received_at": pop_task_received(self.request.id),
+                # Task body started, after payload decoding and IPC to the pool process
+                "started_at": started_at,
+                "array_time": start_time - started_at,
+                "inference_time": inference_time,
+                "postprocess_time": processing_time - inference_time
+            }
         }
         
+        # Keep a searchable copy for site-level reporting
+        if store:
+            try:
+                save_result(self.request.id, result, site_id=site_id, blast_id=blast_id, captured_at=captured_at)
+            except Exception as e:
+                # The store is for reporting, it must not fail the task
+                print(f"Could not save result to store: {e}")
+        
         return result
     
     except Exception as e:
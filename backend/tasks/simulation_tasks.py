@@ -0,0 +1,22 @@
+import random
+import time
+
+from core.celery_app import celery_app
+from tasks.inference_tasks import ModelTask
+
+@celery_app.task(base=ModelTask, name="tasks.simulation_tasks.simulate_inference")
+def simulate_inference(service_time, jitter=0.2):
+    """
+    Stand-in for process_image used by the load generator
+    
+    Args:
+        service_time: Mean time in seconds the task takes
+        jitter: Relative random variation of the service time
+    
+    Returns:
+        result: Dictionary with the simulated processing time
+    """
+    duration = max(0.0, service_time * (1 + random.uniform(-jitter, jitter)))
+    time.sleep(duration)
+    
+    return {"processing_time": duration}
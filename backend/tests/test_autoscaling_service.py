@@ -0,0 +1,208 @@
+import os
+from collections import deque
+from urllib.parse import urlparse
+
+import pytest
+import redis
+
+from core import metrics
+from core.config import settings
+from services import autoscaling_service
+from services.autoscaling_service import Autoscaler, desired_workers
+
+class FakeScaler:
+    """Records worker counts instead of starting processes"""
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.calls = []
+
+    def current(self):
+        return self.workers
+
+    def scale(self, workers):
+        self.calls.append(workers)
+        self.workers = workers
+
+class FakeMetrics:
+    """Stands in for core.metrics without Redis"""
+
+    def __init__(self, service_time=2.0, model_load_time=30.0):
+        self.queue_depth = 0
+        self.completed = 0
+        self.service_times = [service_time]
+        self.model_load_times = [model_load_time]
+
+    def get_queue_depth(self, queue_name=None):
+        return self.queue_depth
+
+    def get_tasks_completed(self):
+        return self.completed
+
+    def get_service_times(self, limit=50):
+        return self.service_times
+
+    def get_model_load_times(self, limit=10):
+        return self.model_load_times
+
+@pytest.fixture
+def policy_settings(monkeypatch):
+    monkeypatch.setattr(settings, "AUTOSCALE_MIN_WORKERS", 1)
+    monkeypatch.setattr(settings, "AUTOSCALE_MAX_WORKERS", 8)
+    monkeypatch.setattr(settings, "AUTOSCALE_WORKER_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "AUTOSCALE_TARGET_WAIT_S", 30.0)
+    monkeypatch.setattr(settings, "AUTOSCALE_SCALE_DOWN_COOLDOWN_S", 60.0)
+
+@pytest.fixture
+def fake_metrics(monkeypatch, policy_settings):
+    fake = FakeMetrics()
+    monkeypatch.setattr(autoscaling_service, "metrics", fake)
+    return fake
+
+def test_desired_workers_keeps_up_with_arrivals(policy_settings):
+    # 0.5 tasks/s at 4 s each needs 2 busy slots
+    assert desired_workers(0, 0.5, 4.0, 0.0, 2) == 2
+
+def test_desired_workers_scales_out_ahead_of_model_load(policy_settings):
+    # One worker finishes 0.5 tasks/s but 1 task/s arrives: the queue grows
+    # by 15 tasks while a new worker loads for 30 s, so size for that backlog
+    without_load = desired_workers(0, 1.0, 2.0, 0.0, 1)
+    with_load = desired_workers(0, 1.0, 2.0, 30.0, 1)
+
+    assert without_load == 2
+    assert with_load == 3
+
+def test_desired_workers_clamps_to_bounds(policy_settings):
+    assert desired_workers(1000, 10.0, 5.0, 20.0, 1) == 8
+    assert desired_workers(0, 0.0, 5.0, 20.0, 4) == 1
+    assert desired_workers(1000, 10.0, 5.0, 20.0, 1, max_workers=3) == 3
+    assert desired_workers(0, 0.0, 5.0, 20.0, 4, min_workers=2) == 2
+
+def test_desired_workers_divides_by_concurrency(policy_settings):
+    # 4 busy slots on workers with 2 slots each
+    assert desired_workers(0, 2.0, 2.0, 0.0, 2, concurrency=2) == 2
+
+def test_step_scales_out_on_backlog(fake_metrics):
+    scaler = FakeScaler(workers=1)
+    autoscaler = Autoscaler(scaler)
+
+    fake_metrics.queue_depth = 60
+    status = autoscaler.step(now=1000.0)
+
+    assert status["target_workers"] > 1
+    assert scaler.workers == status["target_workers"]
+
+def test_step_respects_scale_down_cooldown(fake_metrics):
+    scaler = FakeScaler(workers=1)
+    autoscaler = Autoscaler(scaler)
+
+    fake_metrics.queue_depth = 60
+    autoscaler.step(now=1000.0)
+    scaled_to = scaler.workers
+    assert scaled_to > 1
+
+    # Queue drained, but still within the cooldown after scaling out
+    fake_metrics.queue_depth = 0
+    fake_metrics.completed = 60
+    autoscaler.step(now=1010.0)
+    assert scaler.workers == scaled_to
+
+    # After the cooldown, remove one worker per step
+    autoscaler.step(now=1070.0)
+    assert scaler.workers == scaled_to - 1
+    autoscaler.step(now=1080.0)
+    assert scaler.workers == scaled_to - 1
+    autoscaler.step(now=1131.0)
+    assert scaler.workers == scaled_to - 2
+
+def simulate(autoscaler, scaler, fake, arrivals, service_time, model_load_time, step_s=5.0):
+    """
+    Run the control loop against a simulated queue
+
+    Workers only start taking tasks model_load_time after they are added.
+    Returns the worker count and queue depth at every step.
+    """
+    ready_at = deque([0.0] * scaler.workers)
+    history = []
+    carry = 0.0
+
+    for i, arriving in enumerate(arrivals):
+        now = i * step_s
+
+        # Workers added or removed by the last step
+        while len(ready_at) < scaler.workers:
+            ready_at.append(now + model_load_time)
+        while len(ready_at) > scaler.workers:
+            ready_at.pop()
+
+        ready = sum(1 for t in ready_at if t <= now)
+        carry += ready * step_s / service_time
+        done = min(fake.queue_depth + arriving, int(carry))
+        carry -= done
+
+        fake.queue_depth += arriving - done
+        fake.completed += done
+
+        # Idle capacity is lost, it does not pile up for later
+        if fake.queue_depth == 0:
+            carry = 0.0
+
+        autoscaler.step(now=now)
+        history.append((scaler.workers, fake.queue_depth))
+
+    return history
+
+def test_simulated_burst_scales_out_and_back_in(fake_metrics):
+    # Quiet, a 2-minute burst of 1 task/s, then quiet again (bursts around blast times)
+    arrivals = [0] * 12 + [5] * 24 + [0] * 96
+    scaler = FakeScaler(workers=1)
+    autoscaler = Autoscaler(scaler)
+
+    history = simulate(autoscaler, scaler, fake_metrics, arrivals, service_time=2.0, model_load_time=30.0)
+    workers = [w for w, _ in history]
+    depths = [d for _, d in history]
+
+    # Scale out during the burst, within bounds
+    assert max(workers[12:36]) >= 3
+    assert max(workers) <= settings.AUTOSCALE_MAX_WORKERS
+
+    # The backlog drains and the pool returns to the minimum
+    assert depths[-1] == 0
+    assert workers[-1] == settings.AUTOSCALE_MIN_WORKERS
+
+def _local_redis():
+    # A db path in the URL overrides the db argument, so build the client from the host and port
+    url = urlparse(os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+    client = redis.Redis(host=url.hostname or "localhost", port=url.port or 6379, password=url.password, db=15)
+    try:
+        client.ping()
+    except redis.RedisError:
+        return None
+    return client
+
+def test_step_against_local_redis(monkeypatch, policy_settings):
+    client = _local_redis()
+    if client is None:
+        pytest.skip("No Redis server reachable at CELERY_BROKER_URL")
+
+    # Use a separate database so the real queue and metrics are untouched
+    assert client.connection_pool.connection_kwargs["db"] == 15
+    client.flushdb()
+    monkeypatch.setattr(metrics, "_client", client)
+    monkeypatch.setattr(settings, "AUTOSCALE_QUEUE", "autoscaler-test")
+
+    try:
+        for _ in range(10):
+            metrics.record_service_time(2.0)
+        metrics.record_model_load_time(30.0)
+        client.rpush("autoscaler-test", *["task"] * 40)
+
+        scaler = FakeScaler(workers=1)
+        status = Autoscaler(scaler).step(now=1000.0)
+
+        assert status["queue_depth"] == 40
+        assert status["service_time"] == 2.0
+        assert status["model_load_time"] == 30.0
+        assert scaler.workers == status["target_workers"] > 1
+    finally:
+        client.flushdb()
@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("detectron2")
+
+from detectron2.structures import Boxes, Instances
+
+from core.config import settings
+from services import model_service
+
+def _instances(masks):
+    """Instances with boxes taken from boolean masks of shape (N, H, W)"""
+    masks = np.asarray(masks, dtype=bool)
+    height, width = masks.shape[1:]
+    boxes = []
+    for mask in masks:
+        ys, xs = np.nonzero(mask)
+        boxes.append([xs.min(), ys.min(), xs.max() + 1, ys.max() + 1])
+
+    instances = Instances((height, width))
+    instances.pred_masks = torch.from_numpy(masks)
+    instances.pred_boxes = Boxes(torch.tensor(boxes, dtype=torch.float32).reshape(-1, 4))
+    instances.scores = torch.ones(len(masks))
+    return instances
+
+def _label_model(predictor, image_bgr, short_edge):
+    """Stand-in for _run_at_scale that finds every labelled fragment in the crop it sees"""
+    labels = image_bgr[:, :, 0]
+    masks = [labels == label for label in np.unique(labels) if label != 0]
+    return _instances(np.array(masks).reshape(-1, *labels.shape))
+
+def _label_image(height, width, squares):
+    """Image whose first channel labels square fragments given as (x, y, size)"""
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    for label, (x, y, size) in enumerate(squares, start=1):
+        image[y:y + size, x:x + size, 0] = label
+    return image
+
+def test_tile_ranges_cover_with_overlap():
+    ranges = model_service._tile_ranges(1000, 300, 80)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == 1000
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end - start >= 80
+    assert model_service._tile_ranges(200, 300, 80) == [(0, 200)]
+
+def test_tile_cores_partition_the_image():
+    ranges = model_service._tile_ranges(1000, 300, 80)
+    cores = model_service._tile_cores(ranges, 1000)
+
+    assert cores[0][0] == 0 and cores[-1][1] == 1000
+    for (_, end), (start, _) in zip(cores, cores[1:]):
+        assert end == start
+    for (start, end), (core_start, core_end) in zip(ranges, cores):
+        assert start <= core_start < core_end <= end
+
+def test_tiled_keeps_each_fragment_once_and_whole(monkeypatch):
+    monkeypatch.setattr(model_service, "_run_at_scale", _label_model)
+    monkeypatch.setattr(settings, "ADAPTIVE_TILE_OVERLAP", 0.2)
+
+    # Large fragments straddling the inner tile edges of 120 px tiles
+    squares = [(70, 70, 60), (150, 20, 50), (20, 160, 55), (230, 230, 40), (5, 5, 10)]
+    image = _label_image(300, 300, squares)
+
+    instances, clipped = model_service._run_tiled(None, image, 120, 800, max_fragment_px=60)
+
+    assert clipped == 0
+    areas = sorted(instances.pred_masks.sum(dim=(1, 2)).tolist())
+    assert areas == sorted(size * size for _, _, size in squares)
+
+def test_tiled_reports_fragments_cut_by_a_small_overlap(monkeypatch):
+    monkeypatch.setattr(model_service, "_run_at_scale", _label_model)
+    monkeypatch.setattr(settings, "ADAPTIVE_TILE_OVERLAP", 0.1)
+
+    # Without the probe size the overlap is 12 px, far less than the fragment
+    image = _label_image(300, 300, [(70, 70, 60)])
+
+    instances, clipped = model_service._run_tiled(None, image, 120, 800)
+
+    # The fragment is cut into pieces, each owned by the tile holding its center
+    assert clipped > 0
+    assert len(instances) > 1
+
+@pytest.fixture
+def adaptive(monkeypatch):
+    """Adaptive settings, a stub predictor and a stub model returning square fragments"""
+    monkeypatch.setattr(settings, "FAKE_MODEL", False)
+    monkeypatch.setattr(settings, "ADAPTIVE_PROBE_SIZE", 400)
+    monkeypatch.setattr(settings, "ADAPTIVE_SCALES", [400, 600, 800, 1000, 1200])
+    monkeypatch.setattr(settings, "ADAPTIVE_MIN_FRAGMENT_PX", 16.0)
+    monkeypatch.setattr(settings, "ADAPTIVE_SMALL_PERCENTILE", 10.0)
+    monkeypatch.setattr(settings, "ADAPTIVE_TILE_OVERLAP", 0.2)
+    monkeypatch.setattr(settings, "ADAPTIVE_MAX_TILES", 16)
+
+    predictor = SimpleNamespace(cfg=SimpleNamespace(INPUT=SimpleNamespace(MIN_SIZE_TEST=800, MAX_SIZE_TEST=1333)))
+    monkeypatch.setattr(model_service, "get_predictor", lambda: predictor)
+
+    stub = SimpleNamespace(fragment_px=0, calls=[], tiled=[])
+
+    def run_at_scale(predictor, image_bgr, short_edge):
+        stub.calls.append(short_edge)
+        height, width = image_bgr.shape[:2]
+        size = stub.fragment_px
+        masks = np.zeros((3 if size else 0, height, width), dtype=bool)
+        for i in range(len(masks)):
+            masks[i, :size, i * size:(i + 1) * size] = True
+        return _instances(masks)
+
+    def run_tiled(predictor, image_bgr, tile_size, short_edge, max_fragment_px=0):
+        stub.tiled.append((tile_size, short_edge, max_fragment_px))
+        return run_at_scale(predictor, image_bgr, short_edge), 0
+
+    monkeypatch.setattr(model_service, "_run_at_scale", run_at_scale)
+    monkeypatch.setattr(model_service, "_run_tiled", run_tiled)
+    return stub
+
+def _blank(height, width):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+def test_adaptive_reuses_probe_for_coarse_fragments(adaptive):
+    # 100 px fragments are 40 px wide at the 0.4 probe factor
+    adaptive.fragment_px = 100
+    _, scale_info = model_service.predict_image_adaptive(_blank(1000, 1000))
+
+    assert adaptive.calls == [400]
+    assert scale_info["mode"] == "resize"
+    assert scale_info["short_edge"] == 400
+
+def test_adaptive_picks_smallest_sufficient_scale(adaptive):
+    # 30 px fragments need a factor of 16 / 30, first reached at 600
+    adaptive.fragment_px = 30
+    _, scale_info = model_service.predict_image_adaptive(_blank(1000, 1000))
+
+    assert adaptive.calls == [400, 600]
+    assert scale_info["short_edge"] == 600
+    assert scale_info["scale_factor"] == pytest.approx(0.6)
+
+def test_adaptive_respects_max_size_test(adaptive):
+    # A 1000 short edge would be enough, but the long edge caps the factor at 1333 / 4000
+    adaptive.fragment_px = 20
+    _, scale_info = model_service.predict_image_adaptive(_blank(500, 4000))
+
+    assert scale_info["mode"] == "tiled"
+    assert adaptive.tiled == [(1500, 1200, 20.0)]
+    assert scale_info["tiles"] == model_service._count_tiles(500, 4000, 1500, 20.0)
+
+def test_adaptive_grows_tiles_to_the_limit(adaptive):
+    # 4 px fragments would need 300 px tiles, 81 of them on this image
+    adaptive.fragment_px = 4
+    _, scale_info = model_service.predict_image_adaptive(_blank(2000, 2000))
+
+    tile_size = scale_info["tile_size"]
+    assert model_service._count_tiles(2000, 2000, 300, 4.0) > settings.ADAPTIVE_MAX_TILES
+    assert tile_size > 300
+    assert scale_info["tiles"] == model_service._count_tiles(2000, 2000, tile_size, 4.0)
+    assert scale_info["tiles"] <= settings.ADAPTIVE_MAX_TILES
+
+def test_adaptive_falls_back_when_probe_finds_nothing(adaptive):
+    _, scale_info = model_service.predict_image_adaptive(_blank(1000, 1000))
+
+    assert adaptive.calls == [400, 800]
+    assert scale_info["mode"] == "fixed"
+    assert scale_info["probe_fragments"] == 0
@@ -0,0 +1,53 @@
+from services import results_store
+from services.cdf_service import calculate_cdf_from_areas
+
+def _result(areas_px, pixel_size_mm):
+    stats, _ = calculate_cdf_from_areas(areas_px, pixel_size_mm, plot=False)
+    return {"stats": stats, "processing_time": 1.0}
+
+def test_normalize_timestamp_accepts_trailing_z():
+    assert results_store.normalize_timestamp("2024-05-01T10:00:00Z") == "2024-05-01T10:00:00"
+    assert results_store.normalize_timestamp("2024-05-01T12:00:00+02:00") == "2024-05-01T10:00:00"
+
+def test_curve_filters_by_site_and_time(tmp_path):
+    db = str(tmp_path / "results.db")
+    results_store.save_result("a", _result([100, 400, 900], 1.0), site_id="north",
+                              captured_at="2024-05-01T10:00:00Z", db_path=db)
+    results_store.save_result("b", _result([100], 1.0), site_id="south",
+                              captured_at="2024-05-02T10:00:00Z", db_path=db)
+
+    curve = results_store.aggregate_curve(site_id="north", db_path=db)
+    assert curve["images"] == 1
+    assert curve["fragments"] == 3
+
+    rows = results_store.query_images(start="2024-05-02T00:00:00Z", db_path=db)
+    assert [row["task_id"] for row in rows] == ["b"]
+
+def test_rescale_updates_stats_and_size_bins(tmp_path):
+    db = str(tmp_path / "results.db")
+    areas = [100, 400, 900, 1600]
+    results_store.save_result("a", _result(areas, 1.0), db_path=db)
+    before = results_store.aggregate_curve(db_path=db)
+
+    rescaled = _result(areas, 2.0)["stats"]
+    assert results_store.rescale_result("a", rescaled, db_path=db)
+    assert not results_store.rescale_result("missing", rescaled, db_path=db)
+
+    row = results_store.query_images(db_path=db)[0]
+    assert row["pixel_size_mm"] == 2.0
+    assert row["d50"] == rescaled["D50"]
+
+    # Doubling the pixel size doubles every diameter
+    after = results_store.aggregate_curve(db_path=db)
+    assert after["fragments"] == len(areas)
+    assert abs(after["stats"]["D50"] / before["stats"]["D50"] - 2.0) < 0.1
+
+def test_week_trend_does_not_split_at_year_boundary(tmp_path):
+    db = str(tmp_path / "results.db")
+    # Tuesday to Sunday of one Monday-based week, then the next Monday
+    for i, day in enumerate(["2024-12-31", "2025-01-02", "2025-01-05", "2025-01-06"]):
+        results_store.save_result(str(i), _result([100], 1.0), captured_at=f"{day}T12:00:00Z", db_path=db)
+
+    points = results_store.trend("week", db_path=db)
+
+    assert [(p["period"], p["images"]) for p in points] == [("2024-12-30", 3), ("2025-01-06", 1)]
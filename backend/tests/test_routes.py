@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import routes
+
+class FakeResult:
+    """Finished task as returned by AsyncResult"""
+
+    def __init__(self, result, failed=False):
+        self.result = result
+        self._failed = failed
+
+    def ready(self):
+        return True
+
+    def failed(self):
+        return self._failed
+
+class FakeCelery:
+    """Records sent tasks instead of publishing them to the broker"""
+
+    def __init__(self):
+        self.sent = []
+        self.results = {}
+
+    def AsyncResult(self, task_id):
+        return self.results[task_id]
+
+    def send_task(self, name, args=None, kwargs=None, task_id=None):
+        self.sent.append({"name": name, "args": args, "kwargs": kwargs, "task_id": task_id})
+
+@pytest.fixture
+def celery(monkeypatch):
+    fake = FakeCelery()
+    monkeypatch.setattr(routes, "celery_app", fake)
+    return fake
+
+@pytest.fixture
+def jobs(monkeypatch):
+    saved = {}
+
+    def save_video_job(job_id, frames, sampler, truncated=False):
+        saved[job_id] = {"frames": frames, "truncated": truncated}
+
+    monkeypatch.setattr(routes, "save_video_job", save_video_job)
+    return saved
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    return TestClient(app)
+
+def _png(seed):
+    image = np.random.default_rng(seed).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+def test_predict_sequence_queues_each_distinct_image(client, celery, jobs):
+    files = [("files", (f"{i}.png", _png(i), "image/png")) for i in range(2)]
+    response = client.post("/api/predict/sequence", files=files, data={"frame_interval_s": "1.0"})
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["frames_queued"] == 2
+    assert not body["truncated"]
+    assert [f["time_s"] for f in jobs[body["job_id"]]["frames"]] == [0.0, 1.0]
+    assert len(celery.sent) == 2
+    assert np.array(celery.sent[0]["args"][0]).shape == (60, 80, 3)
+
+def test_predict_sequence_rejects_undecodable_image(client, celery, jobs):
+    files = [("files", ("0.png", b"not an image", "image/png"))]
+    response = client.post("/api/predict/sequence", files=files)
+
+    assert response.status_code == 400
+    assert not celery.sent
+
+@pytest.mark.parametrize("data", [{"pixel_size_mm": "0"}, {"pixel_size_mm": "-1"}, {"frame_interval_s": "0"}])
+def test_predict_sequence_rejects_non_positive_parameters(client, celery, jobs, data):
+    files = [("files", ("0.png", _png(0), "image/png"))]
+    response = client.post("/api/predict/sequence", files=files, data=data)
+
+    assert response.status_code == 400
+    assert not celery.sent
+
+def test_predict_video_rejects_non_positive_pixel_size(client, celery, jobs):
+    files = {"file": ("clip.mp4", b"", "video/mp4")}
+    response = client.post("/api/predict/video", files=files, data={"pixel_size_mm": "0"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "pixel_size_mm must be positive"
+
+@pytest.fixture
+def store(monkeypatch):
+    rescaled = {}
+
+    def rescale_result(task_id, stats, db_path=None):
+        rescaled[task_id] = stats
+        return True
+
+    monkeypatch.setattr(routes.results_store, "rescale_result", rescale_result)
+    return rescaled
+
+def test_rescale_recomputes_stats_and_updates_store(client, celery, store):
+    celery.results["t"] = FakeResult({"stats": {"areas_px": [100, 400, 900]}})
+    response = client.post("/api/task/t/rescale", json={"pixel_size_mm": 2.0})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["stored"]
+    assert body["stats"]["pixel_size_mm"] == 2.0
+    # 30 px wide at 2 mm per pixel is 6 cm
+    assert body["stats"]["Dmax"] == pytest.approx(6.0)
+    assert store["t"] == body["stats"]
+
+def test_rescale_accepts_result_without_fragments(client, celery, store):
+    celery.results["t"] = FakeResult({"stats": {"N": 0, "areas_px": []}})
+    response = client.post("/api/task/t/rescale", json={"pixel_size_mm": 2.0})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["stats"]["N"] == 0
+    assert body["cdf_plot"] is None
+
+def test_rescale_rejects_result_without_pixel_areas(client, celery, store):
+    celery.results["t"] = FakeResult({"stats": {"N": 3}})
+    response = client.post("/api/task/t/rescale", json={"pixel_size_mm": 2.0})
+
+    assert response.status_code == 422
+    assert not store
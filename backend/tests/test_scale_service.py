@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from core.config import settings
+from services.scale_service import detect_scale_bar, resolve_pixel_size
+
+@pytest.fixture(autouse=True)
+def scale_settings(monkeypatch):
+    monkeypatch.setattr(settings, "PIXEL_SIZE_MM", 3.0)
+    monkeypatch.setattr(settings, "SITE_PIXEL_SIZE_MM", {"pit-a": 2.5})
+    monkeypatch.setattr(settings, "SCALE_BAR_MIN_ASPECT", 4.0)
+    monkeypatch.setattr(settings, "SCALE_BAR_MIN_LENGTH_PX", 20)
+    monkeypatch.setattr(settings, "SCALE_BAR_HSV_RANGE", None)
+
+def _image(bars, height=300, width=400):
+    """Gray image with filled bars given as (x, y, w, h, bgr)"""
+    image = np.full((height, width, 3), 120, dtype=np.uint8)
+    for x, y, w, h, colour in bars:
+        image[y:y + h, x:x + w] = colour
+    return image
+
+def _box_bounds(detection):
+    box = np.array(detection["box"])
+    return box[:, 0].min(), box[:, 1].min(), box[:, 0].max(), box[:, 1].max()
+
+def test_detects_bar_length_and_box():
+    detection = detect_scale_bar(_image([(100, 150, 200, 10, (20, 20, 20))]))
+
+    assert detection["length_px"] == pytest.approx(200, abs=3)
+    x0, y0, x1, y1 = _box_bounds(detection)
+    assert x0 == pytest.approx(100, abs=3) and x1 == pytest.approx(300, abs=3)
+    assert y0 == pytest.approx(150, abs=3) and y1 == pytest.approx(160, abs=3)
+
+def test_ignores_candidates_touching_the_border():
+    # A belt edge along the left border is longer than the bar
+    image = _image([(0, 0, 10, 300, (20, 20, 20)), (100, 150, 120, 10, (20, 20, 20))])
+    detection = detect_scale_bar(image)
+
+    assert detection["length_px"] == pytest.approx(120, abs=3)
+
+def test_roi_box_is_in_image_coordinates():
+    image = _image([(50, 50, 250, 10, (20, 20, 20)), (200, 200, 100, 8, (20, 20, 20))])
+
+    assert detect_scale_bar(image)["length_px"] == pytest.approx(250, abs=3)
+
+    detection = detect_scale_bar(image, roi=(180, 180, 150, 50))
+    assert detection["length_px"] == pytest.approx(100, abs=3)
+    x0, y0, x1, y1 = _box_bounds(detection)
+    assert x0 == pytest.approx(200, abs=3) and y0 == pytest.approx(200, abs=3)
+    assert x1 == pytest.approx(300, abs=3) and y1 == pytest.approx(208, abs=3)
+
+def test_hsv_range_keeps_only_marker_colour(monkeypatch):
+    image = _image([(50, 50, 250, 10, (20, 20, 20)), (100, 200, 120, 10, (0, 0, 255))])
+    monkeypatch.setattr(settings, "SCALE_BAR_HSV_RANGE", [0, 100, 100, 10, 255, 255])
+
+    detection = detect_scale_bar(image)
+    assert detection["length_px"] == pytest.approx(120, abs=3)
+    assert _box_bounds(detection)[1] == pytest.approx(200, abs=3)
+
+def test_no_bar_found():
+    assert detect_scale_bar(_image([(100, 100, 40, 40, (20, 20, 20))])) is None
+
+def test_resolve_priority():
+    image = _image([(100, 150, 200, 10, (20, 20, 20))])
+
+    assert resolve_pixel_size(image, pixel_size_mm=1.5, site_id="pit-a", reference_length_mm=1000) == (1.5, "request", None)
+
+    pixel_size, source, calibration = resolve_pixel_size(image, site_id="pit-a", reference_length_mm=1000)
+    assert source == "reference"
+    assert pixel_size == pytest.approx(1000 / calibration["length_px"])
+    assert calibration["reference_length_mm"] == 1000
+
+    assert resolve_pixel_size(image, site_id="pit-a") == (2.5, "site", None)
+    assert resolve_pixel_size(image, site_id="pit-b") == (3.0, "default", None)
+
+def test_resolve_falls_back_when_bar_not_found():
+    image = _image([])
+
+    assert resolve_pixel_size(image, site_id="pit-a", reference_length_mm=1000) == (2.5, "site", None)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from services.cdf_service import calculate_cdf_from_areas
+from services.video_service import FrameSampler, build_time_series
+
+def _frame(seed):
+    return np.random.default_rng(seed).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+
+def test_time_sampling_skips_duplicates():
+    sampler = FrameSampler("time", interval_s=1.0, hash_distance=6)
+    a, b = _frame(0), _frame(1)
+
+    assert sampler.accept(0.0, a)
+    assert not sampler.accept(1.0, a.copy())
+    assert sampler.accept(2.0, b)
+    assert sampler.skipped_duplicates == 1
+
+def test_due_respects_interval():
+    sampler = FrameSampler("time", interval_s=1.0)
+    assert sampler.due(0.0)
+    sampler.accept(0.0, _frame(0))
+    assert not sampler.due(0.5)
+    assert sampler.due(1.0)
+
+def test_motion_reference_is_last_kept_frame():
+    sampler = FrameSampler("motion", interval_s=0.0, motion_threshold=8.0, hash_distance=6)
+    a, b = _frame(0), _frame(1)
+
+    assert sampler.accept(0.0, a)
+    assert not sampler.accept(1.0, a.copy())  # static
+    assert sampler.accept(2.0, b)
+
+    # a moved relative to b but duplicates an earlier kept frame, so it is
+    # dropped and b stays the motion reference: b again counts as static
+    assert not sampler.accept(3.0, a.copy())
+    assert not sampler.accept(4.0, b.copy())
+    assert sampler.skipped_duplicates == 1
+    assert sampler.skipped_static == 2
+
+def test_empty_frame_gives_zero_stats():
+    stats, plot = calculate_cdf_from_areas([], pixel_size_mm=10.0, plot=True)
+
+    assert plot is None
+    assert stats["N"] == 0
+    assert stats["D50"] == 0.0
+    assert stats["diameters_cm"] == []
+
+def test_time_series_includes_empty_frames():
+    frames = [{"time_s": 0.0, "task_id": "a"}, {"time_s": 1.0, "task_id": "b"}]
+    empty, _ = calculate_cdf_from_areas([], pixel_size_mm=10.0, plot=False)
+    full, _ = calculate_cdf_from_areas([100, 400, 900], pixel_size_mm=10.0, plot=False)
+
+    series = build_time_series(frames, {"a": {"stats": empty}, "b": {"stats": full}}, window=2)
+
+    assert [p["N"] for p in series] == [0, 3]
+    assert series[1]["rolling_D50"] == (0.0 + full["D50"]) / 2